@@ -0,0 +1,145 @@
+"""
+Parité et performances du moteur d'extraction en flux (ooxml_stream.py)
+
+- compare les moteurs "object" (python-docx / python-pptx) et "stream" sur
+  tous les .docx / .pptx de Support_Cours_Préparation : texte brut et
+  questions des quiz Word
+- mesure le débit et la mémoire maximale (processus séparé par moteur) sur
+  un grand diaporama généré, avec surlignage par remplissage et a:highlight
+
+Usage: python bench_ooxml_stream.py [--slides 200] [--paragraphs 100]
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from pptx import Presentation
+from pptx.dml.color import RGBColor
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
+from pptx.util import Inches
+
+import extract_quiz_from_pptx as extractors
+from ooxml_stream import stream_raw_text_from_docx, stream_raw_text_from_pptx
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+# Extracteurs sans le cache de fichiers analysés
+raw_text_extractors = {
+    ".docx": extractors.extract_raw_text_from_docx.__wrapped__,
+    ".pptx": extractors.extract_raw_text_from_pptx.__wrapped__,
+}
+stream_extractors = {
+    ".docx": stream_raw_text_from_docx,
+    ".pptx": stream_raw_text_from_pptx,
+}
+
+
+def object_raw_text(path):
+    extractors.EXTRACTION_ENGINE = "object"
+    return raw_text_extractors[Path(path).suffix](path)
+
+
+def docx_quiz(path, engine):
+    extractors.EXTRACTION_ENGINE = engine
+    return extractors.extract_quiz_from_docx.__wrapped__(path)
+
+
+def generate_deck(path, slides, paragraphs):
+    """Diaporama de test : une option sur 7 en fond jaune, une sur 11 en a:highlight jaune"""
+    prs = Presentation()
+    layout = prs.slide_layouts[1]  # titre + contenu
+    for slide_num in range(slides):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"Question {slide_num}"
+        frame = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(9), Inches(5)).text_frame
+        for i in range(paragraphs):
+            paragraph = frame.paragraphs[0] if i == 0 else frame.add_paragraph()
+            run = paragraph.add_run()
+            run.text = f"{'ABCD'[i % 4]}) Option {slide_num}.{i} du quiz"
+            if i % 7 == 0:
+                run.font.fill.solid()
+                run.font.fill.fore_color.rgb = RGBColor(0xFF, 0xFF, 0x00)
+            elif i % 11 == 0:
+                run._r.get_or_add_rPr().append(parse_xml(
+                    '<a:highlight %s><a:srgbClr val="FFFF00"/></a:highlight>' % nsdecls('a')))
+        slide.notes_slide.notes_text_frame.text = f"Réponse: {'ABCD'[slide_num % 4]}"
+    prs.save(path)
+
+
+def _peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if RESOURCE_AVAILABLE else 0
+
+
+def _measure(engine, path, queue):
+    baseline = _peak_rss()
+    start = time.perf_counter()
+    result = object_raw_text(path) if engine == "object" else stream_extractors[Path(path).suffix](path)
+    elapsed = time.perf_counter() - start
+    queue.put((result['raw_text'], elapsed, _peak_rss() - baseline))
+
+
+def measure(engine, path):
+    """(texte, durée, hausse de la mémoire maximale en Ko) dans un processus neuf"""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(engine, path, queue))
+    process.start()
+    outcome = queue.get()
+    process.join()
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="Support_Cours_Préparation")
+    parser.add_argument("--slides", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=100)
+    args = parser.parse_args()
+
+    # Parité sur le corpus existant
+    files = sorted(path for path in Path(args.source).rglob("*")
+                   if path.suffix in raw_text_extractors and not path.name.startswith('~$'))
+    object_time = stream_time = 0.0
+    mismatches = 0
+    for path in files:
+        start = time.perf_counter()
+        expected = object_raw_text(path)
+        object_time += time.perf_counter() - start
+        start = time.perf_counter()
+        streamed = stream_extractors[path.suffix](path)
+        stream_time += time.perf_counter() - start
+        same = expected == streamed
+        if path.suffix == ".docx":
+            same = same and docx_quiz(path, "object") == docx_quiz(path, "stream")
+        if not same:
+            mismatches += 1
+            print(f"❌ Sortie différente: {path}")
+    print(f"{'✅' if not mismatches else '⚠️'} Parité: {len(files) - mismatches}/{len(files)} fichiers identiques")
+    print(f"   Corpus: object {object_time:.2f}s, stream {stream_time:.2f}s (x{object_time / stream_time:.1f})")
+
+    # Grand diaporama généré
+    with tempfile.TemporaryDirectory() as tmp:
+        deck = os.path.join(tmp, "large_deck.pptx")
+        generate_deck(deck, args.slides, args.paragraphs)
+        object_text, object_elapsed, object_peak = measure("object", deck)
+        stream_text, stream_elapsed, stream_peak = measure("stream", deck)
+
+    print(f"📊 Diaporama généré: {args.slides} slides x {args.paragraphs} paragraphes")
+    print(f"   object: {object_elapsed * 1000:.0f} ms" + (f", {object_peak / 1024:.0f} Mo de pic mémoire en plus" if RESOURCE_AVAILABLE else ""))
+    print(f"   stream: {stream_elapsed * 1000:.0f} ms" + (f", {stream_peak / 1024:.0f} Mo de pic mémoire en plus" if RESOURCE_AVAILABLE else "")
+          + f"  (x{object_elapsed / stream_elapsed:.1f})")
+    print(f"   Sorties identiques: {object_text == stream_text}, "
+          f"{stream_text.count('✅')} lignes surlignées")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Banc d'essai de la détection du surlignage dans extract_raw_text_from_pptx
+
+Compare l'extracteur actuel (un seul parcours des paragraphes et des runs)
+à l'ancienne version, qui parcourait tous les runs de la forme pour chaque
+ligne et rattachait un run à une ligne par recherche de sous-chaîne :
+- parité des sorties sur les fichiers .pptx de Support_Cours_Préparation
+- durée d'extraction sur un diaporama généré avec de grandes zones de texte
+
+Usage: python bench_pptx_highlight.py [--slides 10] [--paragraphs 200] [--repeat 3]
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from pptx import Presentation
+from pptx.dml.color import RGBColor
+from pptx.util import Inches
+
+from extract_quiz_from_pptx import extract_raw_text_from_pptx
+
+# Extracteur actuel sans le cache de fichiers analysés
+current_extractor = extract_raw_text_from_pptx.__wrapped__
+
+
+def legacy_extractor(pptx_path):
+    """Ancienne détection du surlignage (quadratique en taille de texte par forme)"""
+    prs = Presentation(str(pptx_path))
+
+    full_text = []
+    for slide_num, slide in enumerate(prs.slides, start=1):
+        full_text.append(f"\n--- Slide {slide_num} ---")
+
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and shape.text.strip():
+                shape_text = shape.text.strip()
+
+                has_yellow_bg = False
+                if hasattr(shape, 'fill') and shape.fill.type is not None:
+                    try:
+                        if hasattr(shape.fill, 'fore_color'):
+                            rgb = shape.fill.fore_color.rgb
+                            if rgb and rgb[0] > 200 and rgb[1] > 200 and rgb[2] < 100:
+                                has_yellow_bg = True
+                    except:
+                        pass
+
+                processed_lines = []
+                for line in shape_text.split('\n'):
+                    line_stripped = line.strip()
+                    if not line_stripped:
+                        continue
+
+                    line_has_highlight = has_yellow_bg
+                    if hasattr(shape, 'text_frame'):
+                        for paragraph in shape.text_frame.paragraphs:
+                            for run in paragraph.runs:
+                                if run.text.strip() and run.text.strip() in line_stripped:
+                                    try:
+                                        if hasattr(run.font, 'fill') and run.font.fill.type is not None:
+                                            if hasattr(run.font.fill, 'fore_color'):
+                                                rgb = run.font.fill.fore_color.rgb
+                                                if rgb and rgb[0] > 200 and rgb[1] > 200 and rgb[2] < 100:
+                                                    line_has_highlight = True
+                                    except:
+                                        pass
+                                    try:
+                                        if hasattr(run.font, 'highlight_color') and run.font.highlight_color:
+                                            if run.font.highlight_color == 7:
+                                                line_has_highlight = True
+                                    except:
+                                        pass
+
+                    if line_has_highlight and re.match(r'^[A-Fa-f][\)\.]', line_stripped):
+                        processed_lines.append(f"{line_stripped} ✅ [BONNE RÉPONSE]")
+                    elif line_has_highlight:
+                        processed_lines.append(f"{line_stripped} ✅")
+                    else:
+                        processed_lines.append(line_stripped)
+
+                full_text.extend(processed_lines)
+
+        if slide.has_notes_slide:
+            notes = slide.notes_slide.notes_text_frame.text.strip()
+            if notes:
+                full_text.append(f"[Notes: {notes}]")
+
+    return {'success': True, 'raw_text': "\n".join(full_text), 'file': Path(pptx_path).name}
+
+
+def generate_deck(path, slides, paragraphs):
+    """Diaporama de test : une grande zone de texte par slide, une option sur 7 surlignée"""
+    prs = Presentation()
+    layout = prs.slide_layouts[6]  # vide
+    for slide_num in range(slides):
+        slide = prs.slides.add_slide(layout)
+        frame = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(6)).text_frame
+        for i in range(paragraphs):
+            paragraph = frame.paragraphs[0] if i == 0 else frame.add_paragraph()
+            run = paragraph.add_run()
+            run.text = f"{'ABCD'[i % 4]}) Option {slide_num}.{i} du quiz"
+            if i % 7 == 0:
+                run.font.fill.solid()
+                run.font.fill.fore_color.rgb = RGBColor(0xFF, 0xFF, 0x00)
+    prs.save(path)
+
+
+def timed(extractor, path, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = extractor(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="Support_Cours_Préparation")
+    parser.add_argument("--slides", type=int, default=10)
+    parser.add_argument("--paragraphs", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Parité sur le corpus existant
+    files = sorted(Path(args.source).rglob("*.pptx"))
+    mismatches = [path for path in files if legacy_extractor(path)['raw_text'] != current_extractor(path)['raw_text']]
+    for path in mismatches:
+        print(f"❌ Sortie différente: {path}")
+    print(f"{'✅' if not mismatches else '⚠️'} Parité: {len(files) - len(mismatches)}/{len(files)} fichiers identiques")
+
+    # Grand diaporama généré
+    with tempfile.TemporaryDirectory() as tmp:
+        deck = os.path.join(tmp, "large_deck.pptx")
+        generate_deck(deck, args.slides, args.paragraphs)
+        legacy, legacy_time = timed(legacy_extractor, deck, args.repeat)
+        current, current_time = timed(current_extractor, deck, args.repeat)
+
+    print(f"📊 Diaporama généré: {args.slides} slides x {args.paragraphs} paragraphes")
+    print(f"   Ancienne version: {legacy_time * 1000:.1f} ms")
+    print(f"   Version actuelle: {current_time * 1000:.1f} ms  (x{legacy_time / current_time:.1f})")
+    print(f"   Sorties identiques: {legacy['raw_text'] == current['raw_text']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,72 @@
 from pptx import Presentation
 from pathlib import Path
+import functools
 import json
+import os
 import re
 
+from bounded_cache import LRUCache
+from ooxml_stream import (iter_docx_paragraphs, stream_raw_text_from_docx,
+                          stream_raw_text_from_pptx, is_yellow_color)
+
+# Moteur d'extraction du texte brut et des quiz Word :
+# - "object" : modèle objet de python-docx / python-pptx
+# - "stream" : lecture en flux du XML de l'archive (ooxml_stream.py)
+EXTRACTION_ENGINES = ("object", "stream")
+EXTRACTION_ENGINE = os.getenv("QUIZ_EXTRACTION_ENGINE", "object").lower()
+if EXTRACTION_ENGINE not in EXTRACTION_ENGINES:
+    print(f"⚠️ QUIZ_EXTRACTION_ENGINE inconnu: {EXTRACTION_ENGINE}, utilisation de \"object\"")
+    EXTRACTION_ENGINE = "object"
+
+# Cache des fichiers déjà analysés, clé = (extracteur, chemin, mtime, taille) :
+# un fichier modifié ou remplacé est relu automatiquement
+QUIZ_PARSE_CACHE_SIZE = int(os.getenv("QUIZ_PARSE_CACHE_SIZE", "128"))
+_parse_cache = LRUCache(maxsize=QUIZ_PARSE_CACHE_SIZE)
+
+
+def cached_extraction(extractor):
+    """
+    Met en cache le résultat d'un extracteur pour un fichier donné
+
+    Les résultats en échec ('success' à False) et les exceptions ne sont pas
+    mis en cache. Le résultat est partagé entre les appels : ne pas le modifier.
+    """
+    @functools.wraps(extractor)
+    def wrapper(file_path):
+        try:
+            path = os.path.abspath(str(file_path))
+            stat = os.stat(path)
+        except OSError:
+            return extractor(file_path)
+
+        key = (extractor.__name__, path, stat.st_mtime_ns, stat.st_size)
+        result = _parse_cache.get(key)
+        if result is None:
+            result = extractor(file_path)
+            if not (isinstance(result, dict) and result.get('success') is False):
+                _parse_cache.put(key, result)
+        return result
+
+    return wrapper
+
+
+def parse_cache_stats():
+    """Statistiques du cache des fichiers de quiz analysés"""
+    return _parse_cache.stats()
+
+
+def clear_parse_cache():
+    _parse_cache.clear()
+
+
+@cached_extraction
 def extract_raw_text_from_docx(docx_path):
     """
     Extrait TOUT le texte brut d'un fichier Word
     DÉTECTE le surlignage jaune pour identifier les bonnes réponses
     """
+    if EXTRACTION_ENGINE == "stream":
+        return stream_raw_text_from_docx(docx_path)
     try:
         from docx import Document
         from docx.enum.text import WD_COLOR_INDEX
@@ -61,11 +120,39 @@ def extract_raw_text_from_docx(docx_path):
         }
 
 
+def _is_yellow_fill(fill):
+    """Vrai si un remplissage uni est jaune (RGB proche de 255, 255, 0)"""
+    try:
+        if fill.type is not None and hasattr(fill, 'fore_color'):
+            rgb = fill.fore_color.rgb
+            return bool(rgb) and rgb[0] > 200 and rgb[1] > 200 and rgb[2] < 100
+    except:
+        pass
+    return False
+
+
+def _is_highlighted_run(run):
+    """Vrai si un run a un fond jaune ou un surlignage (a:highlight) jaune"""
+    if hasattr(run.font, 'fill') and _is_yellow_fill(run.font.fill):
+        return True
+    # python-pptx n'expose pas a:highlight : lecture directe du XML du run
+    rPr = run._r.rPr
+    highlight = rPr.find('{http://schemas.openxmlformats.org/drawingml/2006/main}highlight') if rPr is not None else None
+    return highlight is not None and is_yellow_color(highlight)
+
+
+@cached_extraction
 def extract_raw_text_from_pptx(pptx_path):
     """
     Extrait TOUT le texte brut d'un fichier PowerPoint
     DÉTECTE le surlignage jaune pour identifier les bonnes réponses
+
+    Chaque paragraphe d'une forme donne une ligne ; elle est surlignée si la
+    forme a un fond jaune ou si l'un de ses runs est surligné. Paragraphes
+    et runs ne sont parcourus qu'une fois.
     """
+    if EXTRACTION_ENGINE == "stream":
+        return stream_raw_text_from_pptx(pptx_path)
     try:
         from pptx import Presentation
         prs = Presentation(str(pptx_path))
@@ -75,65 +162,33 @@ def extract_raw_text_from_pptx(pptx_path):
             full_text.append(f"\n--- Slide {slide_num} ---")
 
             for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    shape_text = shape.text.strip()
-
-                    # Vérifier si la forme a un fond jaune (fill)
-                    has_yellow_bg = False
-                    if hasattr(shape, 'fill') and shape.fill.type is not None:
-                        try:
-                            if hasattr(shape.fill, 'fore_color'):
-                                rgb = shape.fill.fore_color.rgb
-                                # Détecter les nuances de jaune (RGB proche de 255, 255, 0)
-                                if rgb and rgb[0] > 200 and rgb[1] > 200 and rgb[2] < 100:
-                                    has_yellow_bg = True
-                        except:
-                            pass
-
-                    # Vérifier chaque ligne du texte pour détecter le surlignage au niveau du run
-                    lines = shape_text.split('\n')
-                    processed_lines = []
-
-                    for line in lines:
-                        line_stripped = line.strip()
-                        if not line_stripped:
-                            continue
-
-                        line_has_highlight = has_yellow_bg
-
-                        # Vérifier le surlignage au niveau des runs de texte
-                        if hasattr(shape, 'text_frame'):
-                            for paragraph in shape.text_frame.paragraphs:
-                                for run in paragraph.runs:
-                                    if run.text.strip() and run.text.strip() in line_stripped:
-                                        # Vérifier la couleur de fond du run
-                                        try:
-                                            if hasattr(run.font, 'fill') and run.font.fill.type is not None:
-                                                if hasattr(run.font.fill, 'fore_color'):
-                                                    rgb = run.font.fill.fore_color.rgb
-                                                    if rgb and rgb[0] > 200 and rgb[1] > 200 and rgb[2] < 100:
-                                                        line_has_highlight = True
-                                        except:
-                                            pass
-
-                                        # Vérifier aussi le highlight_color
-                                        try:
-                                            if hasattr(run.font, 'highlight_color') and run.font.highlight_color:
-                                                # Jaune = 7 dans l'énumération MSO_COLOR_TYPE
-                                                if run.font.highlight_color == 7:
-                                                    line_has_highlight = True
-                                        except:
-                                            pass
-
-                        # Marquer les réponses surlignées
-                        if line_has_highlight and re.match(r'^[A-Fa-f][\)\.]', line_stripped):
-                            processed_lines.append(f"{line_stripped} ✅ [BONNE RÉPONSE]")
-                        elif line_has_highlight:
-                            processed_lines.append(f"{line_stripped} ✅")
-                        else:
-                            processed_lines.append(line_stripped)
-
-                    full_text.extend(processed_lines)
+                if not hasattr(shape, "text") or not shape.text.strip():
+                    continue
+
+                # Vérifier si la forme a un fond jaune (fill)
+                has_yellow_bg = hasattr(shape, 'fill') and _is_yellow_fill(shape.fill)
+
+                if hasattr(shape, 'text_frame'):
+                    paragraphs = [
+                        (paragraph.text, any(run.text.strip() and _is_highlighted_run(run)
+                                             for run in paragraph.runs))
+                        for paragraph in shape.text_frame.paragraphs
+                    ]
+                else:
+                    paragraphs = [(line, False) for line in shape.text.split('\n')]
+
+                for text, run_highlighted in paragraphs:
+                    line = text.strip()
+                    if not line:
+                        continue
+
+                    # Marquer les réponses surlignées
+                    if (has_yellow_bg or run_highlighted) and re.match(r'^[A-Fa-f][\)\.]', line):
+                        full_text.append(f"{line} ✅ [BONNE RÉPONSE]")
+                    elif has_yellow_bg or run_highlighted:
+                        full_text.append(f"{line} ✅")
+                    else:
+                        full_text.append(line)
 
             # Ajouter les notes si disponibles
             if slide.has_notes_slide:
@@ -157,6 +212,7 @@ def extract_raw_text_from_pptx(pptx_path):
         }
 
 
+@cached_extraction
 def extract_quiz_from_docx(docx_path):
     """
     Extrait les questions QCM d'un fichier Word (.docx)
@@ -170,14 +226,17 @@ def extract_quiz_from_docx(docx_path):
         dict avec 'success', 'total_questions', 'questions', 'formatted_content'
     """
     try:
-        from docx import Document
-        doc = Document(str(docx_path))
+        if EXTRACTION_ENGINE == "stream":
+            paragraphs = [text for text, _ in iter_docx_paragraphs(docx_path)]
+        else:
+            from docx import Document
+            paragraphs = [para.text for para in Document(str(docx_path)).paragraphs]
         questions = []
         current_question = None
         question_num = 0
 
-        for para in doc.paragraphs:
-            text = para.text.strip()
+        for text in paragraphs:
+            text = text.strip()
             if not text:
                 continue
 
@@ -243,6 +302,7 @@ def extract_quiz_from_docx(docx_path):
         }
 
 
+@cached_extraction
 def extract_quiz_from_pptx(file_path):
     """
     Extrait les questions QCM d'un fichier PowerPoint (.pptx) ou Word (.docx)
@@ -358,6 +418,60 @@ def extract_quiz_from_pptx(file_path):
             'formatted_content': ''
         }
 
+@cached_extraction
+def extract_quiz_questions(pptx_path):
+    """
+    Extrait les questions d'un quiz PowerPoint pour l'API des quiz
+
+    - Première forme avec texte qui n'est pas une option = question
+    - Lignes A), B), etc. = options
+    - Réponse correcte lue dans les notes ("Réponse: A")
+
+    Returns:
+        liste de dicts avec 'id', 'question', 'options', 'correct_answer'
+    """
+    prs = Presentation(str(pptx_path))
+    questions = []
+
+    for slide_num, slide in enumerate(prs.slides, start=1):
+        question_text = ""
+        options = []
+        correct_answer = None
+
+        # Extraire le texte de la slide
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and shape.text.strip():
+                text = shape.text.strip()
+
+                # Première forme avec texte = question
+                if not question_text and not re.match(r'^[A-Fa-f][\)\.]', text):
+                    question_text = text
+                else:
+                    # Extraire les options
+                    lines = text.split('\n')
+                    for line in lines:
+                        line = line.strip()
+                        if re.match(r'^[A-Fa-f][\)\.]', line):
+                            options.append(line)
+
+        # Extraire la réponse des notes
+        if slide.has_notes_slide:
+            notes_text = slide.notes_slide.notes_text_frame.text.strip()
+            match = re.search(r'(?:r[ée]ponse|correct|answer)[:=\s]*([A-Fa-f])', notes_text, re.IGNORECASE)
+            if match:
+                correct_answer = match.group(1).upper()
+
+        if question_text and options:
+            questions.append({
+                'id': slide_num,
+                'question': question_text,
+                'options': options,
+                'correct_answer': correct_answer
+            })
+
+    return questions
+
+
 def test_extract_quiz(course_num, part_num):
     """
     Teste l'extraction de quiz pour un cours/partie spécifique
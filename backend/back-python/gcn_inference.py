@@ -0,0 +1,146 @@
+"""
+Moteur d'inférence NumPy/SciPy pour LessonGCN (sans PyTorch)
+
+Les poids d'un LessonGCN entraîné et la matrice d'adjacence normalisée
+D^-1/2 (A + I) D^-1/2 sont exportés dans un fichier .npz. Le calcul des
+scores se fait ensuite avec deux produits matriciels par couche, ce qui
+permet de servir les recommandations sans importer torch.
+"""
+
+import numpy as np
+
+try:
+    import scipy.sparse as sp
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+
+def normalized_adjacency(edge_index, num_nodes):
+    """
+    Construit l'adjacence normalisée utilisée par GCNConv
+
+    Reproduit gcn_norm de torch_geometric : les boucles existantes sont
+    remplacées par une boucle de poids 1 sur chaque nœud, les arêtes
+    dupliquées s'additionnent et le degré est calculé sur la cible.
+    """
+    edge_index = np.asarray(edge_index, dtype=np.int64).reshape(2, -1)
+    row, col = edge_index[0], edge_index[1]
+    keep = row != col
+    loops = np.arange(num_nodes, dtype=np.int64)
+    row = np.concatenate([row[keep], loops])
+    col = np.concatenate([col[keep], loops])
+    weight = np.ones(row.shape[0], dtype=np.float32)
+
+    deg = np.bincount(col, weights=weight, minlength=num_nodes).astype(np.float32)
+    deg_inv_sqrt = np.zeros_like(deg)
+    deg_inv_sqrt[deg > 0] = deg[deg > 0] ** -0.5
+    weight = deg_inv_sqrt[row] * weight * deg_inv_sqrt[col]
+
+    # Message source -> cible : out[col] += w * x[row]
+    if SCIPY_AVAILABLE:
+        return sp.csr_matrix((weight, (col, row)), shape=(num_nodes, num_nodes), dtype=np.float32)
+
+    adjacency = np.zeros((num_nodes, num_nodes), dtype=np.float32)
+    np.add.at(adjacency, (col, row), weight)
+    return adjacency
+
+
+class NumpyGCN:
+    """LessonGCN en mode inférence (deux couches GCNConv + ReLU)"""
+
+    def __init__(self, adjacency, w1, b1, w2, b2, graph_version=None):
+        self.adjacency = adjacency
+        # Empreinte des fichiers du graphe sur lesquels les poids ont été appris
+        self.graph_version = graph_version
+        self.w1 = np.ascontiguousarray(w1, dtype=np.float32)
+        self.b1 = np.ascontiguousarray(b1, dtype=np.float32)
+        self.w2 = np.ascontiguousarray(w2, dtype=np.float32)
+        self.b2 = np.ascontiguousarray(b2, dtype=np.float32)
+
+    @property
+    def num_nodes(self):
+        return self.adjacency.shape[0]
+
+    @property
+    def in_dim(self):
+        return self.w1.shape[0]
+
+    @classmethod
+    def from_lesson_gcn(cls, model, edge_index, num_nodes, graph_version=None):
+        """Exporte un LessonGCN (torch) vers des tableaux NumPy"""
+        if hasattr(edge_index, "cpu"):
+            edge_index = edge_index.cpu().numpy()
+        # GCNConv stocke la transformation linéaire sous la forme (out, in)
+        return cls(
+            normalized_adjacency(edge_index, num_nodes),
+            model.conv1.lin.weight.detach().cpu().numpy().T,
+            model.conv1.bias.detach().cpu().numpy(),
+            model.conv2.lin.weight.detach().cpu().numpy().T,
+            model.conv2.bias.detach().cpu().numpy(),
+            graph_version=graph_version
+        )
+
+    def predict(self, x):
+        """
+        Retourne les scores bruts (avant sigmoid) pour chaque nœud
+
+        x est de forme (n_nodes, in_dim), ou (n_students, n_nodes, in_dim)
+        pour un lot d'étudiants : le résultat est alors (n_students, n_nodes).
+        """
+        x = np.asarray(x, dtype=np.float32)
+        h = self._propagate(x @ self.w1) + self.b1
+        np.maximum(h, 0, out=h)
+        out = self._propagate(h @ self.w2) + self.b2
+        return out.reshape(x.shape[:-1])
+
+    def _propagate(self, h):
+        """Multiplie par l'adjacence normalisée sur l'axe des nœuds"""
+        if h.ndim == 2:
+            return np.asarray(self.adjacency @ h)
+        # Lot : les étudiants sont empilés en colonnes pour un seul produit matriciel
+        batch, n_nodes, dim = h.shape
+        stacked = h.transpose(1, 0, 2).reshape(n_nodes, batch * dim)
+        out = np.asarray(self.adjacency @ stacked)
+        return out.reshape(n_nodes, batch, dim).transpose(1, 0, 2)
+
+    def save(self, path):
+        """Sauvegarde les poids et l'adjacence dans un fichier .npz"""
+        if SCIPY_AVAILABLE and sp.issparse(self.adjacency):
+            adjacency = self.adjacency.tocoo()
+            rows, cols, values = adjacency.row, adjacency.col, adjacency.data
+        else:
+            rows, cols = np.nonzero(self.adjacency)
+            values = self.adjacency[rows, cols]
+        np.savez(
+            path,
+            num_nodes=np.int64(self.num_nodes),
+            adj_row=rows.astype(np.int64),
+            adj_col=cols.astype(np.int64),
+            adj_val=values.astype(np.float32),
+            w1=self.w1, b1=self.b1, w2=self.w2, b2=self.b2,
+            graph_version=np.str_(self.graph_version or "")
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Charge un modèle exporté avec save()"""
+        with np.load(path) as data:
+            num_nodes = int(data["num_nodes"])
+            rows, cols, values = data["adj_row"], data["adj_col"], data["adj_val"]
+            if SCIPY_AVAILABLE:
+                adjacency = sp.csr_matrix((values, (rows, cols)), shape=(num_nodes, num_nodes))
+            else:
+                adjacency = np.zeros((num_nodes, num_nodes), dtype=np.float32)
+                adjacency[rows, cols] = values
+            # Les exports antérieurs au versionnage n'ont pas de graph_version
+            graph_version = str(data["graph_version"]) if "graph_version" in data.files else None
+            return cls(adjacency, data["w1"], data["b1"], data["w2"], data["b2"],
+                       graph_version=graph_version or None)
+
+
+def sigmoid(x):
+    """Sigmoid numériquement stable"""
+    x = np.asarray(x, dtype=np.float32)
+    e = np.exp(-np.abs(x))
+    return np.where(x >= 0, 1 / (1 + e), e / (1 + e))
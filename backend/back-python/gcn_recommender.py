@@ -1,40 +1,96 @@
+import hashlib
 import json
-import torch
-import torch.nn.functional as F
-from torch_geometric.data import Data
-from torch_geometric.nn import GCNConv
 import os
+import threading
+import time
 import numpy as np
 
-class LessonGCN(torch.nn.Module):
-    """Graph Convolutional Network pour la recommandation de cours"""
-    
-    def __init__(self, in_dim=5, hidden_dim=16, out_dim=1):
-        super().__init__()
-        self.conv1 = GCNConv(in_dim, hidden_dim)
-        self.conv2 = GCNConv(hidden_dim, out_dim)
-        self.dropout = torch.nn.Dropout(0.3)
+from bounded_cache import LRUCache
+from gcn_inference import NumpyGCN, sigmoid
+from subskill_bitset import SUBSKILL_INDEX, iter_bits
+
+# PyTorch n'est nécessaire que pour l'entraînement : l'inférence peut se faire
+# avec le moteur NumPy exporté (gcn_model.npz)
+try:
+    import torch
+    import torch.nn.functional as F
+    from torch_geometric.data import Data
+    from torch_geometric.nn import GCNConv
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
+# Modèle GCN pré-entraîné sur toute la population (voir train_population_model)
+DEFAULT_MODEL_FILE = "gcn_model.pt"
+
+
+# Personnalisation par étudiant (warm-start depuis le modèle de population)
+FINE_TUNE_MAX_EPOCHS = 20
+FINE_TUNE_LR = 0.005
+FINE_TUNE_PATIENCE = 3
+FINE_TUNE_MIN_DELTA = 1e-4
+
+
+def engine_path_for(model_path):
+    """Chemin du moteur NumPy exporté à côté du checkpoint torch"""
+    return os.path.splitext(model_path)[0] + ".npz"
+
+
+if TORCH_AVAILABLE:
+    class LessonGCN(torch.nn.Module):
+        """Graph Convolutional Network pour la recommandation de cours"""
 
-    def forward(self, data):
-        x = self.conv1(data.x, data.edge_index)
-        x = F.relu(x)
-        x = self.dropout(x)
-        x = self.conv2(x, data.edge_index)
-        return x.view(-1)
+        def __init__(self, in_dim=5, hidden_dim=16, out_dim=1):
+            super().__init__()
+            self.conv1 = GCNConv(in_dim, hidden_dim)
+            self.conv2 = GCNConv(hidden_dim, out_dim)
+            self.dropout = torch.nn.Dropout(0.3)
+            # Générateur propre au modèle pour le dropout (entraînement reproductible
+            # même quand d'autres modèles s'entraînent en parallèle)
+            self.generator = None
+
+        def forward(self, data):
+            x = self.conv1(data.x, data.edge_index)
+            x = F.relu(x)
+            if self.training and self.generator is not None:
+                keep = torch.rand(x.shape, generator=self.generator) >= self.dropout.p
+                x = x * keep / (1 - self.dropout.p)
+            else:
+                x = self.dropout(x)
+            x = self.conv2(x, data.edge_index)
+            return x.view(-1)
 
 
 class GCNRecommender:
     """Service de recommandation utilisant un GCN"""
     
-    def __init__(self, data_dir="."):
+    def __init__(self, data_dir=".", model_path=None, cache_size=1024):
         self.data_dir = data_dir
-        self.model = None
+        self.model_path = model_path or os.path.join(data_dir, DEFAULT_MODEL_FILE)
+        self.pretrained_model = None
+        self.population_checkpoint = None
+        self.inference_engine = None
         self.lesson_labels = None
         self.label_to_idx = None
         self.enriched_data = None
         self.forward_paths = None
         self.graph_data = None
-        
+        self.graph_version = None
+        # Incrémenté quand les features statiques changent (compteurs en direct)
+        self.features_version = 0
+        self.struggling_counts = None
+
+        # Cache des recommandations : (sous-acquis, version du graphe, max) → résultat
+        self.cache = LRUCache(maxsize=cache_size)
+
+        # Buffers de features propres à chaque thread (aucun état mutable partagé)
+        self._local = threading.local()
+        self._checkpoint_lock = threading.Lock()
+        # Le générateur aléatoire global de torch sert à initialiser les poids
+        self._init_lock = threading.Lock()
+        self._features_lock = threading.Lock()
+        self._checkpoint_checked = False
+
         # Charger les données
         self._load_data()
         if self.enriched_data and self.graph_data:
@@ -42,6 +98,12 @@ class GCNRecommender:
         else:
             print("⚠️ Génération des données enrichies nécessaire")
             self._generate_enriched_data()
+
+        # Charger le modèle pré-entraîné s'il existe (moteur NumPy en priorité)
+        if os.path.exists(engine_path_for(self.model_path)):
+            self.load_inference_engine()
+        elif TORCH_AVAILABLE and os.path.exists(self.model_path):
+            self.load_model()
     
     def _load_data(self):
         """Charge tous les fichiers JSON nécessaires"""
@@ -51,18 +113,41 @@ class GCNRecommender:
             'forward_paths': 'forward_recommendation_paths.json'
         }
         
+        # Empreinte du contenu des fichiers : change dès qu'un fichier est modifié
+        version = hashlib.sha256()
         for attr_name, filename in files_to_load.items():
             filepath = os.path.join(self.data_dir, filename)
             try:
-                with open(filepath, encoding="utf-8") as f:
-                    setattr(self, attr_name, json.load(f))
+                with open(filepath, 'rb') as f:
+                    content = f.read()
+                version.update(content)
+                setattr(self, attr_name, json.loads(content.decode("utf-8")))
                 print(f"✅ {filename} chargé")
             except FileNotFoundError:
                 print(f"⚠️  Fichier manquant: {filepath}")
                 setattr(self, attr_name, {})
-            except json.JSONDecodeError:
+            except (json.JSONDecodeError, UnicodeDecodeError):
                 print(f"⚠️  Erreur JSON dans: {filepath}")
                 setattr(self, attr_name, {})
+            version.update(b"\0")
+
+        self.graph_version = version.hexdigest()[:16]
+        self.cache.clear()
+
+    def reload_data(self):
+        """Recharge les fichiers du graphe (le cache est invalidé)"""
+        self._load_data()
+        if self.enriched_data and self.graph_data:
+            self._prepare_graph_data()
+
+        # Un modèle appris sur une autre version du graphe n'est plus utilisable
+        if self.population_checkpoint and self.population_checkpoint.get('graph_version') != self.graph_version:
+            print("⚠️  Graphe modifié : modèle de population obsolète ignoré")
+            self.pretrained_model = None
+            self.population_checkpoint = None
+        self._checkpoint_checked = False
+        if self.inference_engine is not None and self.inference_engine.graph_version != self.graph_version:
+            self.inference_engine = None
 
     def _generate_enriched_data(self):
         """Génère les données enrichies si elles n'existent pas"""
@@ -99,157 +184,594 @@ class GCNRecommender:
             except (ValueError, KeyError) as e:
                 print(f"⚠️ Lien ignoré: {link} - {e}")
         
-        if edge_list:
-            self.edge_index = torch.tensor(edge_list, dtype=torch.long).t().contiguous()
-        else:
+        if not edge_list:
             print("⚠️ Aucun lien valide trouvé, utilisation d'un graphe vide")
-            self.edge_index = torch.empty((2, 0), dtype=torch.long)
-    
-    def _build_node_features(self, student_sous_acquis):
-        """Construit les features des nœuds pour un étudiant donné"""
-        # Normalisation robuste
-        in_degrees = [feats.get("in_degree", 0) for feats in self.enriched_data.values()]
-        out_degrees = [feats.get("out_degree", 0) for feats in self.enriched_data.values()]
-        struggling_counts = [feats.get("struggling_students", 0) for feats in self.enriched_data.values()]
-        
-        max_in = max(in_degrees) if in_degrees and max(in_degrees) > 0 else 1
-        max_out = max(out_degrees) if out_degrees and max(out_degrees) > 0 else 1
-        max_struggle = max(struggling_counts) if struggling_counts and max(struggling_counts) > 0 else 1
-        
-        node_features = []
-        for lesson in self.lesson_labels:
-            feats = self.enriched_data[lesson]
-            
-            # Features normalisées avec gestion des valeurs manquantes
-            bloom_norm = feats.get("bloom_norm", 0.0)
-            in_deg_norm = feats.get("in_degree", 0) / max_in
-            out_deg_norm = feats.get("out_degree", 0) / max_out
-            struggle_norm = feats.get("struggling_students", 0) / max_struggle
-            mastery_flag = 1.0 if lesson in student_sous_acquis else 0.0
-            
-            node_features.append([
-                bloom_norm,
-                in_deg_norm, 
-                out_deg_norm,
-                struggle_norm,
-                mastery_flag
-            ])
-        
-        return torch.tensor(node_features, dtype=torch.float)
+        self.edge_index_array = np.array(edge_list, dtype=np.int64).reshape(-1, 2).T.copy()
+        if TORCH_AVAILABLE:
+            self.edge_index = torch.from_numpy(self.edge_index_array)
+
+        self._prepare_static_features()
+        self._prepare_prerequisites()
+
+    def _prepare_prerequisites(self):
+        """
+        Compile les prérequis de chaque cours en masques de bits
+
+        Les positions de bits sont celles de subskill_bitset.SUBSKILL_INDEX (complété
+        si le graphe contient d'autres cours) : un profil étudiant se traduit en
+        un entier, et l'éligibilité de tous les cours en quelques opérations.
+        """
+        forward_paths = self.forward_paths or {}
+        self.prerequisites = {
+            lesson: list(forward_paths.get(lesson, {}).get("immediate_dependencies", []))
+            for lesson in self.lesson_labels
+        }
+        all_prereqs = [p for prereqs in self.prerequisites.values() for p in prereqs]
+        self.subskill_index = SUBSKILL_INDEX.extended(self.lesson_labels + all_prereqs)
+        self.dependent_masks = self.subskill_index.compile_prerequisites(self.prerequisites)
+        self.lessons_mask = self.subskill_index.mask(self.lesson_labels)
+        # Position de bit → indice du cours dans lesson_labels
+        self.bit_to_lesson_idx = {self.subskill_index.positions[lesson]: i
+                                  for i, lesson in enumerate(self.lesson_labels)}
+
+    def _eligible_mask(self, sous_acquis_mask):
+        """Cours non maîtrisés dont aucun prérequis n'est dans les sous-acquis"""
+        blocked = self.subskill_index.blocked(self.dependent_masks, sous_acquis_mask)
+        return sous_acquis_mask & self.lessons_mask & ~blocked
     
-    def train_for_student(self, student_sous_acquis, epochs=200, lr=0.01, verbose=False):
-        """Entraîne le modèle pour un étudiant spécifique"""
+    def _prepare_static_features(self):
+        """Précalcule les colonnes de features indépendantes de l'étudiant"""
+        feats = [self.enriched_data[lesson] for lesson in self.lesson_labels]
+        static = np.array([
+            [f.get("bloom_norm", 0.0), f.get("in_degree", 0),
+             f.get("out_degree", 0), f.get("struggling_students", 0)]
+            for f in feats
+        ], dtype=np.float32).reshape(-1, 4)
+
+        # Normalisation robuste des degrés et du nombre d'étudiants en difficulté
+        col_max = static[:, 1:].max(axis=0) if len(feats) else np.ones(3, dtype=np.float32)
+        static[:, 1:] /= np.where(col_max > 0, col_max, 1)
+
+        # Colonnes : bloom_norm, in_degree, out_degree, struggling, mastery_flag
+        self.static_features = np.ascontiguousarray(static)
+
+    def update_struggling_counts(self, counts):
+        """
+        Met à jour la feature « étudiants en difficulté » avec les compteurs en direct
+
+        Args:
+            counts: dict sous-acquis → nombre d'étudiants ne l'ayant pas maîtrisé
+                    (QuizScorer.get_subskill_counts)
+
+        Returns:
+            True si les features ont changé (les résultats en cache sont alors
+            ignorés), False si les compteurs sont identiques aux précédents
+        """
+        with self._features_lock:
+            if counts == self.struggling_counts or not self.lesson_labels:
+                return False
+            self.struggling_counts = dict(counts)
+            for lesson in self.lesson_labels:
+                self.enriched_data[lesson]['struggling_students'] = self.struggling_counts.get(lesson, 0)
+            # Nouveau tableau : les buffers des threads sont recopiés à leur prochain usage
+            self._prepare_static_features()
+            self.features_version += 1
+            return True
+
+    def _thread_feature_buffer(self):
+        """Buffer de features préalloué du thread courant"""
+        local = self._local
+        static_features = self.static_features
+        if getattr(local, 'static_features', None) is not static_features:
+            n_lessons, n_static = static_features.shape
+            local.buffer = np.zeros((n_lessons, n_static + 1), dtype=np.float32)
+            local.buffer[:, :-1] = static_features
+            local.static_features = static_features
+        return local.buffer
+
+    def _mastery_vector(self, student_sous_acquis):
+        """Vecteur 0/1 des cours non-maîtrisés (ordre de lesson_labels)"""
+        mastery = np.zeros(len(self.lesson_labels), dtype=np.float32)
+        indices = [self.label_to_idx[lesson] for lesson in student_sous_acquis
+                   if lesson in self.label_to_idx]
+        if indices:
+            mastery[indices] = 1.0
+        return mastery
+
+    def _build_batch_features(self, students_sous_acquis):
+        """Features d'un lot d'étudiants : tableau (n_students, n_lessons, n_features)"""
+        n_lessons, n_static = self.static_features.shape
+        x = np.zeros((len(students_sous_acquis), n_lessons, n_static + 1), dtype=np.float32)
+        x[:, :, :-1] = self.static_features
+
+        rows, cols = [], []
+        for row, sous_acquis in enumerate(students_sous_acquis):
+            for lesson in sous_acquis:
+                idx = self.label_to_idx.get(lesson)
+                if idx is not None:
+                    rows.append(row)
+                    cols.append(idx)
+        x[rows, cols, -1] = 1.0
+        return x
+
+    def _build_node_features(self, student_sous_acquis, out=None):
+        """
+        Construit les features des nœuds pour un étudiant donné
+
+        Seule la colonne de maîtrise dépend de l'étudiant : elle est copiée dans
+        le buffer préalloué du thread (ou dans ``out``), les autres colonnes sont
+        statiques. Le résultat est un tableau NumPy float32 (torch.from_numpy
+        pour le GCN), valide jusqu'au prochain appel dans le même thread.
+        """
+        if out is None:
+            out = self._thread_feature_buffer()
+        else:
+            out[:, :-1] = self.static_features
+        out[:, -1] = self._mastery_vector(student_sous_acquis)
+        return out
+
+    def _fit(self, model, data, y, epochs, lr, verbose=False,
+             patience=None, min_delta=FINE_TUNE_MIN_DELTA, deadline=None):
+        """
+        Boucle d'entraînement commune
+
+        Args:
+            patience: arrêt anticipé après `patience` époques sans amélioration
+                      de la loss d'au moins min_delta (None = désactivé)
+            deadline: instant (time.perf_counter) à ne pas dépasser ; l'époque
+                      suivante n'est lancée que si sa durée moyenne tient encore
+
+        Returns:
+            rapport {'epochs', 'loss', 'stopped'} ('max_epochs', 'plateau' ou 'budget')
+        """
+        optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+        best_loss = float("inf")
+        stale_epochs = 0
+        stopped = "max_epochs"
+        loss_value = None
+        epochs_run = 0
+        started = time.perf_counter()
+
+        model.train()
+        for epoch in range(epochs):
+            if deadline is not None and epochs_run:
+                epoch_duration = (time.perf_counter() - started) / epochs_run
+                if time.perf_counter() + epoch_duration > deadline:
+                    stopped = "budget"
+                    break
+
+            optimizer.zero_grad()
+            loss = F.mse_loss(model(data), y)
+            loss.backward()
+            optimizer.step()
+            loss_value = loss.item()
+            epochs_run += 1
+
+            if verbose and epoch % 50 == 0:
+                print(f"Epoch {epoch}, loss = {loss_value:.4f}")
+
+            if patience is not None:
+                if loss_value < best_loss - min_delta:
+                    best_loss = loss_value
+                    stale_epochs = 0
+                else:
+                    stale_epochs += 1
+                    if stale_epochs >= patience:
+                        stopped = "plateau"
+                        break
+
+        model.eval()
+        return {'epochs': epochs_run, 'loss': loss_value, 'stopped': stopped}
+
+    def _new_model(self, in_dim, hidden_dim=None, seed=None):
+        """
+        Crée un LessonGCN
+
+        Avec seed, l'initialisation des poids et le dropout sont reproductibles :
+        les poids sont tirés sous verrou avec la graine, et le dropout utilise
+        un générateur propre au modèle au lieu du générateur global de torch.
+        """
+        kwargs = {'in_dim': in_dim} if hidden_dim is None else {'in_dim': in_dim, 'hidden_dim': hidden_dim}
+        with self._init_lock:
+            if seed is None:
+                return LessonGCN(**kwargs)
+            with torch.random.fork_rng(devices=[]):
+                torch.manual_seed(seed)
+                model = LessonGCN(**kwargs)
+        model.generator = torch.Generator().manual_seed(seed)
+        return model
+
+    def train_for_student(self, student_sous_acquis, epochs=200, lr=0.01, verbose=False, x=None, seed=None):
+        """
+        Entraîne un modèle pour un étudiant spécifique
+
+        Le modèle est propre à l'appel et retourné à l'appelant : aucun état
+        n'est partagé entre deux requêtes concurrentes. seed rend
+        l'entraînement reproductible (voir _new_model).
+        """
+        self._require_torch()
         try:
             # Préparer les données
-            x = self._build_node_features(student_sous_acquis)
+            if x is None:
+                x = self._build_node_features(student_sous_acquis)
+            x = torch.from_numpy(x)
             data = Data(x=x, edge_index=self.edge_index)
             
             # Initialiser le modèle
-            self.model = LessonGCN(in_dim=x.size(1))
-            optimizer = torch.optim.Adam(self.model.parameters(), lr=lr)
+            model = self._new_model(x.size(1), seed=seed)
             
             # Target : 1.0 pour les cours non-maîtrisés, 0.0 pour les maîtrisés
-            y = torch.tensor([1.0 if lesson in student_sous_acquis else 0.0 
-                             for lesson in self.lesson_labels], dtype=torch.float)
+            y = x[:, -1].clone()
             
-            # Boucle d'entraînement
-            self.model.train()
-            for epoch in range(epochs):
-                optimizer.zero_grad()
-                out = self.model(data)
-                loss = F.mse_loss(out, y)
-                loss.backward()
-                optimizer.step()
-                
-                if verbose and epoch % 50 == 0:
-                    print(f"Epoch {epoch}, loss = {loss.item():.4f}")
-                    
+            self._fit(model, data, y, epochs, lr, verbose=verbose)
+            return model
+
         except Exception as e:
             print(f"❌ Erreur lors de l'entraînement: {e}")
             raise
-    
-    def get_recommendations(self, student_data, max_recommendations=5):
-        """Génère des recommandations pour un étudiant"""
+
+    def fine_tune_for_student(self, student_sous_acquis, max_epochs=FINE_TUNE_MAX_EPOCHS,
+                              lr=FINE_TUNE_LR, patience=FINE_TUNE_PATIENCE,
+                              time_budget_ms=None, started=None, x=None, seed=None):
+        """
+        Personnalise le modèle de population pour un étudiant
+
+        Le modèle part des poids du checkpoint de population (warm-start) et
+        ne fait que quelques époques, avec arrêt anticipé sur plateau de la
+        loss. time_budget_ms borne la durée totale depuis `started`
+        (time.perf_counter, par défaut maintenant) ; au moins une époque est
+        toujours effectuée. Sans checkpoint
+        compatible, l'entraînement part de poids aléatoires. seed rend
+        l'entraînement reproductible (voir _new_model).
+
+        Returns:
+            (modèle, rapport d'entraînement)
+        """
+        self._require_torch()
+        started = started if started is not None else time.perf_counter()
+        deadline = started + time_budget_ms / 1000 if time_budget_ms is not None else None
+
+        if x is None:
+            x = self._build_node_features(student_sous_acquis)
+        x = torch.from_numpy(x)
+        data = Data(x=x, edge_index=self.edge_index)
+        y = x[:, -1].clone()
+
+        checkpoint = self.get_population_checkpoint()
+        if checkpoint is not None:
+            model = self._new_model(checkpoint['in_dim'], checkpoint['hidden_dim'], seed=seed)
+            model.load_state_dict(checkpoint['state_dict'])
+        else:
+            model = self._new_model(x.size(1), seed=seed)
+
+        report = self._fit(model, data, y, max_epochs, lr, patience=patience, deadline=deadline)
+        report['warm_start'] = checkpoint is not None
+        return model, report
+
+    def train_batch_model(self, students_sous_acquis, epochs=200, lr=0.01, verbose=False, x=None):
+        """
+        Entraîne un modèle unique sur un lot d'étudiants
+
+        Les features des N étudiants sont empilées sur une dimension de lot
+        (N, n_lessons, n_features) au-dessus de l'edge_index partagé : chaque
+        époque traite tout le lot en une seule série d'opérations tensorielles.
+        """
+        self._require_torch()
+        if x is None:
+            x = self._build_batch_features(students_sous_acquis)
+        if len(x) == 0:
+            raise ValueError("Aucun profil étudiant disponible pour l'entraînement")
+
+        x = torch.from_numpy(x)
+        data = Data(x=x, edge_index=self.edge_index)
+        y = x[..., -1].reshape(-1).clone()
+
+        model = self._new_model(x.size(-1))
+        self._fit(model, data, y, epochs, lr, verbose=verbose)
+        return model
+
+    def train_population_model(self, students_data=None, epochs=200, lr=0.01, verbose=False):
+        """
+        Entraîne un modèle unique sur toute la population d'étudiants
+
+        Le modèle obtenu est partagé par toutes les requêtes : une recommandation
+        se réduit alors à une seule passe forward avec la colonne de maîtrise
+        de l'étudiant.
+        """
+        if students_data is None:
+            students_file = os.path.join(self.data_dir, "students_profiles.json")
+            with open(students_file, encoding="utf-8") as f:
+                students_data = json.load(f)
+
+        model = self.train_batch_model(
+            [set(student.get("sous_acquis", [])) for student in students_data],
+            epochs=epochs, lr=lr, verbose=verbose
+        )
+        self._set_population_model(model)
+        return model
+
+    def _set_population_model(self, model):
+        """Installe un modèle de population (checkpoint + moteur NumPy)"""
+        self.pretrained_model = model
+        self.population_checkpoint = {
+            'in_dim': model.conv1.in_channels,
+            'hidden_dim': model.conv1.out_channels,
+            'graph_version': self.graph_version,
+            'state_dict': {k: v.detach().clone() for k, v in model.state_dict().items()}
+        }
+        self.inference_engine = NumpyGCN.from_lesson_gcn(
+            model, self.edge_index_array, len(self.lesson_labels), graph_version=self.graph_version
+        )
+        self.cache.clear()
+
+    def save_model(self, path=None):
+        """
+        Sauvegarde le modèle pré-entraîné sur disque
+
+        Écrit le checkpoint torch (.pt) et l'export NumPy (.npz) utilisé
+        pour l'inférence sans torch. Les deux fichiers portent la version
+        du graphe sur laquelle le modèle a été entraîné.
+        """
+        if self.population_checkpoint is None:
+            raise ValueError("Aucun modèle pré-entraîné à sauvegarder")
+
+        path = path or self.model_path
+        torch.save(self.population_checkpoint, path)
+        self.inference_engine.save(engine_path_for(path))
+        print(f"✅ Modèle sauvegardé: {path} (+ {engine_path_for(path)})")
+
+    def load_inference_engine(self, path=None):
+        """Charge le moteur d'inférence NumPy exporté (sans torch)"""
+        path = path or engine_path_for(self.model_path)
+        try:
+            engine = NumpyGCN.load(path)
+            if engine.num_nodes != len(self.lesson_labels or []):
+                raise ValueError(f"{engine.num_nodes} nœuds au lieu de {len(self.lesson_labels or [])}")
+            self._check_graph_version(engine.graph_version)
+            self.inference_engine = engine
+            self.cache.clear()
+            print(f"✅ Moteur d'inférence NumPy chargé: {path}")
+        except Exception as e:
+            print(f"⚠️  Impossible de charger le moteur {path}: {e}")
+            self.inference_engine = None
+        return self.inference_engine
+
+    def load_model(self, path=None):
+        """Charge le modèle pré-entraîné depuis le disque"""
+        self._require_torch()
+        path = path or self.model_path
+        try:
+            checkpoint = self._read_checkpoint(path)
+            model = self._new_model(checkpoint['in_dim'], checkpoint['hidden_dim'])
+            model.load_state_dict(checkpoint['state_dict'])
+            model.eval()
+            self._set_population_model(model)
+            print(f"✅ Modèle pré-entraîné chargé: {path}")
+        except Exception as e:
+            print(f"⚠️  Impossible de charger le modèle {path}: {e}")
+            self.pretrained_model = None
+        return self.pretrained_model
+
+    def _read_checkpoint(self, path):
+        """Lit un checkpoint torch et vérifie qu'il correspond au graphe chargé"""
+        checkpoint = torch.load(path, map_location="cpu")
+        self._check_graph_version(checkpoint.get('graph_version'))
+        return checkpoint
+
+    def _check_graph_version(self, version):
+        if version != self.graph_version:
+            raise ValueError(
+                f"checkpoint entraîné sur le graphe {version or 'inconnu'}, "
+                f"graphe actuel {self.graph_version} (réentraîner avec gcn_recommender.py)"
+            )
+
+    def get_population_checkpoint(self):
+        """
+        Checkpoint de population utilisé pour le warm-start
+
+        En service, seul le moteur NumPy est chargé au démarrage : le
+        checkpoint torch n'est lu qu'à la première personnalisation.
+        Retourne None s'il n'existe pas ou ne correspond pas au graphe.
+        """
+        if self.population_checkpoint is not None or self._checkpoint_checked:
+            return self.population_checkpoint
+        with self._checkpoint_lock:
+            if self.population_checkpoint is None and not self._checkpoint_checked:
+                self._checkpoint_checked = True
+                if not os.path.exists(self.model_path):
+                    return None
+                try:
+                    self.population_checkpoint = self._read_checkpoint(self.model_path)
+                    print(f"✅ Checkpoint de population chargé: {self.model_path}")
+                except Exception as e:
+                    print(f"⚠️  Checkpoint {self.model_path} inutilisable: {e}")
+                    self.population_checkpoint = None
+        return self.population_checkpoint
+
+    def _require_torch(self):
+        if not TORCH_AVAILABLE:
+            raise RuntimeError("PyTorch et torch-geometric sont nécessaires pour l'entraînement")
+
+    def can_personalize(self):
+        """Indique si la personnalisation par étudiant (fine-tuning torch) est possible"""
+        return TORCH_AVAILABLE
+
+    def can_recommend(self):
+        """Indique si des recommandations peuvent être calculées"""
+        return bool(self.lesson_labels) and (self.inference_engine is not None or TORCH_AVAILABLE)
+
+    def get_recommendations(self, student_data, max_recommendations=5,
+                            fine_tune_epochs=0, time_budget_ms=None, seed=None):
+        """
+        Génère des recommandations pour un étudiant
+
+        Args:
+            fine_tune_epochs: nombre maximal d'époques de personnalisation
+                              (warm-start depuis le modèle de population)
+            time_budget_ms: durée maximale de la requête ; active la
+                            personnalisation dans la limite de ce budget
+            seed: graine de la personnalisation (résultat reproductible)
+        """
+        started = time.perf_counter()
         if not self.enriched_data or not self.lesson_labels:
             raise ValueError("Les données ne sont pas chargées correctement")
         
         student_id = student_data.get("student_id", "unknown")
         sous_acquis = set(student_data.get("sous_acquis", []))
-        
-        # Entraîner le modèle pour cet étudiant
-        self.train_for_student(sous_acquis, verbose=False)
-        
-        # Prédictions
-        x = self._build_node_features(sous_acquis)
-        data = Data(x=x, edge_index=self.edge_index)
-        
-        self.model.eval()
-        with torch.no_grad():
-            scores = self.model(data)
+        sous_acquis_mask = self._sous_acquis_mask(student_data, sous_acquis)
+
+        # Personnalisation demandée : le résultat est propre à l'appel (pas de cache)
+        personalize = bool(fine_tune_epochs) or time_budget_ms is not None
+        if personalize:
+            self._require_torch()
+            x = self._build_node_features(sous_acquis)
+            model, report = self.fine_tune_for_student(
+                sous_acquis,
+                max_epochs=fine_tune_epochs or FINE_TUNE_MAX_EPOCHS,
+                time_budget_ms=time_budget_ms,
+                started=started,
+                x=x,
+                seed=seed
+            )
+            with torch.no_grad():
+                raw_scores = model(Data(x=torch.from_numpy(x), edge_index=self.edge_index)).numpy()
+            result = self._format_recommendations(sous_acquis_mask, sigmoid(raw_scores), max_recommendations)
+            report['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            return {'student_id': student_id, **result, 'personalization': report}
+
+        cache_key = self._cache_key(sous_acquis, max_recommendations)
+        result = self.cache.get(cache_key)
+        if result is None:
+            x = self._build_node_features(sous_acquis)
+
+            # Modèle partagé (moteur NumPy) si disponible, sinon entraînement pour cet étudiant
+            if self.inference_engine is not None:
+                raw_scores = self.inference_engine.predict(x)
+            else:
+                model = self.train_for_student(sous_acquis, verbose=False, x=x)
+                with torch.no_grad():
+                    raw_scores = model(Data(x=torch.from_numpy(x), edge_index=self.edge_index)).numpy()
+
             # Appliquer sigmoid pour avoir des scores entre 0 et 1
-            scores = torch.sigmoid(scores)
-        
-        # Filtrer les recommandations
+            result = self._format_recommendations(sous_acquis_mask, sigmoid(raw_scores), max_recommendations)
+            self.cache.put(cache_key, result)
+
+        return {'student_id': student_id, **result}
+
+    def get_recommendations_batch(self, students_data, max_recommendations=5):
+        """
+        Génère les recommandations de plusieurs étudiants en un seul calcul
+
+        Les étudiants absents du cache sont traités ensemble : une passe
+        forward sur le lot avec le modèle partagé, ou à défaut un seul
+        entraînement sur le lot (au lieu d'un entraînement par étudiant).
+
+        Returns:
+            liste de résultats, dans l'ordre de students_data
+        """
+        if not self.enriched_data or not self.lesson_labels:
+            raise ValueError("Les données ne sont pas chargées correctement")
+
+        results = [None] * len(students_data)
+        pending = {}  # clé de cache → (sous-acquis, masque, indices des étudiants concernés)
+        for i, student_data in enumerate(students_data):
+            sous_acquis = set(student_data.get("sous_acquis", []))
+            cache_key = self._cache_key(sous_acquis, max_recommendations)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                results[i] = {'student_id': student_data.get("student_id", "unknown"), **cached}
+            else:
+                sous_acquis_mask = self._sous_acquis_mask(student_data, sous_acquis)
+                pending.setdefault(cache_key, (sous_acquis, sous_acquis_mask, []))[2].append(i)
+
+        if pending:
+            batch = [sous_acquis for sous_acquis, _, _ in pending.values()]
+            x = self._build_batch_features(batch)
+            if self.inference_engine is not None:
+                raw_scores = self.inference_engine.predict(x)
+            else:
+                model = self.train_batch_model(batch, x=x)
+                with torch.no_grad():
+                    raw_scores = model(Data(x=torch.from_numpy(x), edge_index=self.edge_index))
+                raw_scores = raw_scores.reshape(len(batch), -1).numpy()
+            scores = sigmoid(raw_scores)
+
+            for row, (cache_key, (_, sous_acquis_mask, indices)) in enumerate(pending.items()):
+                result = self._format_recommendations(sous_acquis_mask, scores[row], max_recommendations)
+                self.cache.put(cache_key, result)
+                for i in indices:
+                    results[i] = {'student_id': students_data[i].get("student_id", "unknown"), **result}
+
+        return results
+
+    def _cache_key(self, sous_acquis, max_recommendations):
+        """Le résultat ne dépend que des sous-acquis, du graphe, des features et de max_recommendations"""
+        return (frozenset(sous_acquis), self.graph_version, self.features_version, max_recommendations)
+
+    def _sous_acquis_mask(self, student_data, sous_acquis):
+        """Masque fourni avec le profil (QuizStorage), sinon calculé depuis la liste"""
+        mask = student_data.get("sous_acquis_mask")
+        return self.subskill_index.mask(sous_acquis) if mask is None else mask
+
+    def _format_recommendations(self, sous_acquis_mask, scores, max_recommendations):
+        """Construit la réponse (hors student_id) à partir des scores des cours"""
+        # Cours non maîtrisés dont les prérequis sont maîtrisés (masques de bits)
+        eligible = self._eligible_mask(sous_acquis_mask)
         recommendations = []
-        for i, lesson in enumerate(self.lesson_labels):
-            if lesson in sous_acquis:  # Cours non-maîtrisé
-                if self._prerequisites_mastered(lesson, sous_acquis):
-                    lesson_data = self.enriched_data[lesson]
-                    recommendations.append({
-                        'lesson_id': lesson,
-                        'lesson_name': lesson_data.get('name', lesson),
-                        'priority_score': float(scores[i].item()),
-                        'bloom_level': lesson_data.get('bloom_level', 1),
-                        'prerequisites': self._get_prerequisites(lesson),
-                        'difficulty_indicators': {
-                            'struggling_students': lesson_data.get('struggling_students', 0),
-                            'bloom_level': lesson_data.get('bloom_level', 1)
-                        }
-                    })
+        for i in sorted(self.bit_to_lesson_idx[bit] for bit in iter_bits(eligible)):
+            lesson = self.lesson_labels[i]
+            lesson_data = self.enriched_data[lesson]
+            recommendations.append({
+                'lesson_id': lesson,
+                'lesson_name': lesson_data.get('name', lesson),
+                'priority_score': float(scores[i]),
+                'bloom_level': lesson_data.get('bloom_level', 1),
+                'prerequisites': self._get_prerequisites(lesson),
+                'difficulty_indicators': {
+                    'struggling_students': lesson_data.get('struggling_students', 0),
+                    'bloom_level': lesson_data.get('bloom_level', 1)
+                }
+            })
         
         # Trier par priorité et limiter
         recommendations.sort(key=lambda x: x['priority_score'], reverse=True)
         
         # Générer toutes les prédictions si demandé
         all_predictions = []
+        positions = self.subskill_index.positions
         for i, lesson in enumerate(self.lesson_labels):
             lesson_data = self.enriched_data[lesson]
             all_predictions.append({
                 'lesson_id': lesson,
                 'lesson_name': lesson_data.get('name', lesson),
-                'score': float(scores[i].item()),
-                'status': 'needs_work' if lesson in sous_acquis else 'mastered'
+                'score': float(scores[i]),
+                'status': 'needs_work' if sous_acquis_mask >> positions[lesson] & 1 else 'mastered'
             })
         
         return {
-            'student_id': student_id,
-            'total_non_mastered': len(sous_acquis),
+            'total_non_mastered': sous_acquis_mask.bit_count(),
             'eligible_for_study': len(recommendations),
             'recommendations': recommendations[:max_recommendations] if max_recommendations > 0 else recommendations,
             'all_predictions': all_predictions
         }
     
-    def _prerequisites_mastered(self, lesson, sous_acquis):
-        """Vérifie si les prérequis d'un cours sont maîtrisés"""
-        if not self.forward_paths:
-            return True  # Si pas de données de prérequis, considérer comme éligible
-            
-        prereqs = self.forward_paths.get(lesson, {}).get("immediate_dependencies", [])
-        # Un prérequis est maîtrisé s'il N'est PAS dans sous_acquis
-        return all(p not in sous_acquis for p in prereqs)
-    
     def _get_prerequisites(self, lesson):
         """Récupère la liste des prérequis d'un cours"""
-        if not self.forward_paths:
-            return []
-        return self.forward_paths.get(lesson, {}).get("immediate_dependencies", [])
+        return list(self.prerequisites.get(lesson, []))
     
     def get_model_info(self):
         """Retourne des informations sur le modèle"""
         return {
             'total_lessons': len(self.lesson_labels) if self.lesson_labels else 0,
-            'total_edges': self.edge_index.shape[1] // 2 if hasattr(self, 'edge_index') else 0,
-            'model_trained': self.model is not None,
+            'total_edges': self.edge_index_array.shape[1] // 2 if hasattr(self, 'edge_index_array') else 0,
+            'model_trained': self.inference_engine is not None,
+            'pretrained_model': self.inference_engine is not None,
+            'fine_tuning_available': TORCH_AVAILABLE,
+            'inference_backend': 'numpy' if self.inference_engine is not None else ('torch' if TORCH_AVAILABLE else None),
+            'graph_version': self.graph_version,
+            'features_version': self.features_version,
+            'live_struggling_counts': self.struggling_counts is not None,
+            'cache': self.cache.stats(),
             'available_data': {
                 'enriched_data': bool(self.enriched_data),
                 'graph_data': bool(self.graph_data), 
@@ -301,4 +823,20 @@ class GCNRecommender:
         lessons_by_difficulty.sort(key=lambda x: x['struggling_students'], reverse=True)
         analysis['most_difficult_lessons'] = lessons_by_difficulty[:10]
         
-        return analysis
\ No newline at end of file
+        return analysis
+
+
+if __name__ == "__main__":
+    # Entraînement hors-ligne du modèle partagé sur students_profiles.json
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Entraîne le GCN sur toute la population d'étudiants")
+    parser.add_argument("--data-dir", default=".")
+    parser.add_argument("--epochs", type=int, default=200)
+    parser.add_argument("--lr", type=float, default=0.01)
+    parser.add_argument("--output", default=None, help=f"Fichier de sortie (défaut: {DEFAULT_MODEL_FILE})")
+    args = parser.parse_args()
+
+    recommender = GCNRecommender(data_dir=args.data_dir)
+    recommender.train_population_model(epochs=args.epochs, lr=args.lr, verbose=True)
+    recommender.save_model(args.output)
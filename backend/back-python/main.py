@@ -15,6 +15,7 @@ load_dotenv()
 
 # Import des routes de recommandation
 from recommendation_routes import router as recommendation_router
+from quiz_bank import load_quiz_bank
 
 # Configuration UTF-8 pour Windows
 if sys.platform == "win32":
@@ -35,14 +36,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configuration OpenAI avec la nouvelle API
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY")
-)
-
 # Chemin vers les fichiers de cours
 COURS_BASE_PATH = Path("./Support_Cours_Préparation")
 
+# Client OpenAI et banque de quiz, créés au démarrage de l'application (et
+# non à l'import, que les workers du pool de recommandations répètent)
+client = None
+quiz_bank = None
+
+
+def init_app_resources():
+    """Crée le client OpenAI et charge la banque de quiz (startup)"""
+    global client, quiz_bank
+    # Configuration OpenAI avec la nouvelle API
+    client = OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY")
+    )
+    # Quiz précompilés (python quiz_bank.py build) : les requêtes n'analysent
+    # que les fichiers absents de la banque ou modifiés depuis sa construction
+    quiz_bank = load_quiz_bank(COURS_BASE_PATH)
+
+
+app.router.add_event_handler("startup", init_app_resources)
+
 
 # Modèles Pydantic
 class ChatMessage(BaseModel):
@@ -115,7 +131,6 @@ async def quiz_chat_with_ai(request: ChatRequest):
     Endpoint pour un quiz interactif géré par l'IA
     """
     try:
-        from extract_quiz_from_pptx import extract_raw_text_from_docx, extract_raw_text_from_pptx
         import logging
 
         # Configuration du logging
@@ -155,11 +170,8 @@ async def quiz_chat_with_ai(request: ChatRequest):
                 logger.info(f"   📄 Lecture du fichier: {quiz_file.name}")
 
                 try:
-                    # Extraire texte brut selon le type de fichier
-                    if quiz_file.suffix == '.docx':
-                        result = extract_raw_text_from_docx(quiz_file)
-                    else:  # .pptx
-                        result = extract_raw_text_from_pptx(quiz_file)
+                    # Texte brut précompilé (ou extrait selon le type de fichier)
+                    result = quiz_bank.raw_text(quiz_file)
 
                     if result['success'] and result['raw_text'].strip():
                         has_quiz_file = True
@@ -590,9 +602,6 @@ async def get_quiz_questions(course_number: int, part_number: int):
     Retourne les questions de quiz pour une partie spécifique d'un cours
     """
     try:
-        from pptx import Presentation
-        import re
-
         part_folder = f"{course_number}.{part_number}"
         quizz_folder = COURS_BASE_PATH / str(course_number) / part_folder / "Quizz"
 
@@ -605,44 +614,8 @@ async def get_quiz_questions(course_number: int, part_number: int):
             raise HTTPException(status_code=404, detail="Aucun fichier de quiz trouvé")
 
         quiz_file = pptx_files[0]
-        prs = Presentation(str(quiz_file))
-        questions = []
-
-        for slide_num, slide in enumerate(prs.slides, start=1):
-            question_text = ""
-            options = []
-            correct_answer = None
-
-            # Extraire le texte de la slide
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    text = shape.text.strip()
-
-                    # Première forme avec texte = question
-                    if not question_text and not re.match(r'^[A-Fa-f][\)\.]', text):
-                        question_text = text
-                    else:
-                        # Extraire les options
-                        lines = text.split('\n')
-                        for line in lines:
-                            line = line.strip()
-                            if re.match(r'^[A-Fa-f][\)\.]', line):
-                                options.append(line)
-
-            # Extraire la réponse des notes
-            if slide.has_notes_slide:
-                notes_text = slide.notes_slide.notes_text_frame.text.strip()
-                match = re.search(r'(?:r[ée]ponse|correct|answer)[:=\s]*([A-Fa-f])', notes_text, re.IGNORECASE)
-                if match:
-                    correct_answer = match.group(1).upper()
-
-            if question_text and options:
-                questions.append({
-                    'id': slide_num,
-                    'question': question_text,
-                    'options': options,
-                    'correct_answer': correct_answer
-                })
+        # Questions précompilées (ou analyse mise en cache si le fichier a changé)
+        questions = quiz_bank.quiz_questions(quiz_file)
 
         return {
             'quiz_file': quiz_file.name,
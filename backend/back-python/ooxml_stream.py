@@ -0,0 +1,312 @@
+"""
+Extraction en flux des fichiers .docx / .pptx (sans python-docx ni python-pptx)
+
+Les fichiers Office sont des archives zip de parties XML. Au lieu de
+construire tout le modèle objet (Document() / Presentation() chargent aussi
+les médias, dispositions et masques), ce moteur ouvre l'archive et lit avec
+iterparse uniquement :
+- docx : la partie principale (word/document.xml en général)
+- pptx : ppt/slides/*.xml dans l'ordre de la présentation, et leurs notes
+
+Le surlignage (w:highlight, w:shd, remplissage ou a:highlight des runs
+PowerPoint) est lu au fil de l'analyse, et chaque paragraphe est libéré dès
+qu'il est traité : la mémoire reste bornée quelle que soit la taille du
+fichier. Les sorties reproduisent celles des extracteurs de
+extract_quiz_from_pptx.py (même texte, mêmes marqueurs ✅).
+"""
+
+import io
+import posixpath
+import re
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+OFFICE_DOCUMENT_REL = "/officeDocument"
+NOTES_SLIDE_REL = "/notesSlide"
+
+# Codes couleur jaune reconnus dans w:shd (comme extract_raw_text_from_docx)
+YELLOW_SHADING = ('FFFF00', 'FFFF99', 'FFFFCC', 'FFFFE0', 'FFEB3B', 'FDD835')
+
+# Équivalents texte des éléments d'un run Word (comme python-docx)
+DOCX_RUN_TEXT = {W + "cr": "\n", W + "noBreakHyphen": "-", W + "ptab": "\t", W + "tab": "\t"}
+
+FILL_TAGS = {A + tag for tag in ("noFill", "solidFill", "gradFill", "blipFill", "pattFill", "grpFill")}
+COLOR_TAGS = {A + tag for tag in ("scrgbClr", "srgbClr", "hslClr", "sysClr", "schemeClr", "prstClr")}
+
+OPTION_PATTERN = re.compile(r'^[A-Fa-f][\)\.]')
+
+
+# ----------------------------------------------------------------------
+# Archive et relations
+# ----------------------------------------------------------------------
+
+def _relationships(archive, part_name):
+    """dict rId → (type, partie cible) des relations internes d'une partie"""
+    directory, name = posixpath.split(part_name)
+    rels_name = posixpath.join(directory, "_rels", name + ".rels")
+    try:
+        data = archive.read(rels_name)
+    except KeyError:
+        return {}
+    relationships = {}
+    for _, element in iterparse(io.BytesIO(data)):
+        if element.tag == REL + "Relationship" and element.get("TargetMode") != "External":
+            target = element.get("Target")
+            if target.startswith("/"):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join(directory, target))
+            relationships[element.get("Id")] = (element.get("Type", ""), target)
+    return relationships
+
+
+def _main_part(archive, default):
+    for rel_type, target in _relationships(archive, "").values():
+        if rel_type.endswith(OFFICE_DOCUMENT_REL):
+            return target
+    return default
+
+
+def _iter_children_of(stream, parent_tag, child_tags):
+    """
+    Éléments child_tags enfants directs d'un élément parent_tag, au fil de l'analyse
+
+    Tout enfant de parent_tag (retenu ou non, par exemple un tableau) est
+    retiré du parent une fois lu : seul l'élément en cours reste en mémoire.
+    """
+    stack = []
+    for event, element in iterparse(stream, events=("start", "end")):
+        if event == "start":
+            stack.append(element)
+            continue
+        stack.pop()
+        if stack and stack[-1].tag == parent_tag:
+            if element.tag in child_tags:
+                yield element
+            stack[-1].remove(element)
+
+
+def _file_name(path):
+    return path.name if hasattr(path, 'name') else str(path)
+
+
+# ----------------------------------------------------------------------
+# Word
+# ----------------------------------------------------------------------
+
+def _docx_run_text(run):
+    parts = []
+    for child in run:
+        if child.tag == W + "t":
+            parts.append(child.text or "")
+        elif child.tag == W + "br":
+            # Sauts de page / colonne : pas de texte
+            parts.append("\n" if child.get(W + "type", "textWrapping") == "textWrapping" else "")
+        else:
+            parts.append(DOCX_RUN_TEXT.get(child.tag, ""))
+    return "".join(parts)
+
+
+def _docx_run_highlighted(run):
+    rPr = run.find(W + "rPr")
+    if rPr is None:
+        return False
+    highlight = rPr.find(W + "highlight")
+    if highlight is not None and highlight.get(W + "val") == "yellow":
+        return True
+    shd = rPr.find(".//" + W + "shd")
+    fill = shd.get(W + "fill") if shd is not None else None
+    return bool(fill) and fill.upper() in YELLOW_SHADING
+
+
+def iter_docx_paragraphs(docx_path):
+    """
+    (texte, surligné) de chaque paragraphe du corps du document
+
+    Comme Document().paragraphs : paragraphes directement sous w:body (pas
+    ceux des tableaux), texte des runs et des liens hypertexte.
+    """
+    with zipfile.ZipFile(str(docx_path)) as archive:
+        with archive.open(_main_part(archive, "word/document.xml")) as stream:
+            for paragraph in _iter_children_of(stream, W + "body", (W + "p",)):
+                parts, highlighted = [], False
+                for child in paragraph:
+                    if child.tag == W + "r":
+                        parts.append(_docx_run_text(child))
+                        if not highlighted:
+                            highlighted = _docx_run_highlighted(child)
+                    elif child.tag == W + "hyperlink":
+                        parts.extend(_docx_run_text(run) for run in child.findall(W + "r"))
+                yield "".join(parts), highlighted
+
+
+def stream_raw_text_from_docx(docx_path):
+    """Équivalent en flux de extract_raw_text_from_docx"""
+    try:
+        full_text = []
+        for text, highlighted in iter_docx_paragraphs(docx_path):
+            text = text.strip()
+            if not text:
+                continue
+            if highlighted and OPTION_PATTERN.match(text):
+                full_text.append(f"{text} ✅ [BONNE RÉPONSE]")
+            elif highlighted:
+                full_text.append(f"{text} ✅")
+            else:
+                full_text.append(text)
+
+        return {
+            'success': True,
+            'raw_text': "\n".join(full_text),
+            'file': _file_name(docx_path)
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e),
+            'raw_text': '',
+            'file': _file_name(docx_path)
+        }
+
+
+# ----------------------------------------------------------------------
+# PowerPoint
+# ----------------------------------------------------------------------
+
+def is_yellow_color(parent):
+    """Vrai si la première couleur de parent est un RGB jaune (R et V > 200, B < 100)"""
+    for child in parent:
+        if child.tag in COLOR_TAGS:
+            if child.tag != A + "srgbClr":
+                return False
+            try:
+                value = child.get("val")
+                red, green, blue = int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)
+            except (TypeError, ValueError):
+                return False
+            return red > 200 and green > 200 and blue < 100
+    return False
+
+
+def _yellow_fill(properties):
+    """Remplissage uni jaune parmi les enfants de spPr / rPr"""
+    if properties is None:
+        return False
+    for child in properties:
+        if child.tag in FILL_TAGS:
+            return child.tag == A + "solidFill" and is_yellow_color(child)
+    return False
+
+
+def _pptx_run_highlighted(run):
+    rPr = run.find(A + "rPr")
+    if rPr is None:
+        return False
+    if _yellow_fill(rPr):
+        return True
+    highlight = rPr.find(A + "highlight")
+    return highlight is not None and is_yellow_color(highlight)
+
+
+def _pptx_paragraph(paragraph):
+    """(texte, surligné) d'un a:p : runs, champs, et \\v pour les sauts de ligne"""
+    parts, highlighted = [], False
+    for child in paragraph:
+        if child.tag in (A + "r", A + "fld"):
+            t = child.find(A + "t")
+            text = (t.text or "") if t is not None else ""
+            parts.append(text)
+            if child.tag == A + "r" and not highlighted and text.strip():
+                highlighted = _pptx_run_highlighted(child)
+        elif child.tag == A + "br":
+            parts.append("\v")
+    return "".join(parts), highlighted
+
+
+def _iter_text_shapes(stream):
+    """(fond jaune, [(texte, surligné)] par paragraphe) de chaque p:sp de l'arbre des formes"""
+    for shape in _iter_children_of(stream, P + "spTree", (P + "sp",)):
+        tx_body = shape.find(P + "txBody")
+        paragraphs = [_pptx_paragraph(p) for p in tx_body.findall(A + "p")] if tx_body is not None else []
+        yield _yellow_fill(shape.find(P + "spPr")), paragraphs
+
+
+def _notes_text(archive, notes_part):
+    """Texte de l'espace réservé "body" des notes (comme notes_slide.notes_text_frame)"""
+    with archive.open(notes_part) as stream:
+        for shape in _iter_children_of(stream, P + "spTree", (P + "sp", P + "pic", P + "graphicFrame")):
+            ph = shape.find(f"./*/{P}nvPr/{P}ph")
+            if ph is not None and ph.get("type") == "body":
+                tx_body = shape.find(P + "txBody")
+                if tx_body is None:
+                    return ""
+                return "\n".join(_pptx_paragraph(p)[0] for p in tx_body.findall(A + "p"))
+    raise ValueError(f"Espace réservé des notes introuvable dans {notes_part}")
+
+
+def iter_pptx_slides(pptx_path):
+    """
+    Pour chaque slide, dans l'ordre de la présentation :
+    (formes [(fond jaune, paragraphes)], texte des notes ou None)
+    """
+    with zipfile.ZipFile(str(pptx_path)) as archive:
+        presentation = _main_part(archive, "ppt/presentation.xml")
+        relationships = _relationships(archive, presentation)
+        with archive.open(presentation) as stream:
+            slide_ids = [element.get(R + "id")
+                         for _, element in iterparse(stream) if element.tag == P + "sldId"]
+
+        for slide_id in slide_ids:
+            slide_part = relationships[slide_id][1]
+            with archive.open(slide_part) as stream:
+                shapes = list(_iter_text_shapes(stream))
+            notes = None
+            for rel_type, target in _relationships(archive, slide_part).values():
+                if rel_type.endswith(NOTES_SLIDE_REL):
+                    notes = _notes_text(archive, target)
+                    break
+            yield shapes, notes
+
+
+def stream_raw_text_from_pptx(pptx_path):
+    """Équivalent en flux de extract_raw_text_from_pptx"""
+    try:
+        full_text = []
+        for slide_num, (shapes, notes) in enumerate(iter_pptx_slides(pptx_path), start=1):
+            full_text.append(f"\n--- Slide {slide_num} ---")
+
+            for has_yellow_bg, paragraphs in shapes:
+                if not "\n".join(text for text, _ in paragraphs).strip():
+                    continue
+                for text, run_highlighted in paragraphs:
+                    line = text.strip()
+                    if not line:
+                        continue
+                    if (has_yellow_bg or run_highlighted) and OPTION_PATTERN.match(line):
+                        full_text.append(f"{line} ✅ [BONNE RÉPONSE]")
+                    elif has_yellow_bg or run_highlighted:
+                        full_text.append(f"{line} ✅")
+                    else:
+                        full_text.append(line)
+
+            if notes is not None and notes.strip():
+                full_text.append(f"[Notes: {notes.strip()}]")
+
+        return {
+            'success': True,
+            'raw_text': "\n".join(full_text),
+            'file': _file_name(pptx_path)
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e),
+            'raw_text': '',
+            'file': _file_name(pptx_path)
+        }
@@ -0,0 +1,280 @@
+"""
+Banque de quiz précompilée à partir de Support_Cours_Préparation
+
+La commande build parcourt tout l'arbre des supports, passe chaque fichier
+.pptx / .docx dans les extracteurs de extract_quiz_from_pptx.py et écrit
+une seule banque JSON compressée : questions, options, réponses, texte
+brut, lignes surlignées et empreinte SHA-256 de chaque fichier source.
+
+L'API charge la banque une fois au démarrage : tant qu'un fichier n'a pas
+changé depuis la construction, les requêtes n'ouvrent ni python-pptx ni
+python-docx. Un fichier absent de la banque ou modifié depuis est analysé
+à la demande (avec le cache de extract_quiz_from_pptx.py).
+
+L'analyse (python-pptx / python-docx, limitée par le GIL) est répartie sur
+un pool de processus ; les résultats sont fusionnés dans l'ordre des
+chemins, la banque est donc identique quel que soit le nombre de workers.
+
+Usage:
+    python quiz_bank.py build [--source Support_Cours_Préparation] [--out quiz_bank.json.gz]
+                              [--workers N] [--strict] [--quiet]
+"""
+
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+BANK_VERSION = 1
+DEFAULT_SOURCE = "Support_Cours_Préparation"
+DEFAULT_BANK_PATH = "quiz_bank.json.gz"
+QUIZ_EXTENSIONS = (".pptx", ".docx")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_quiz_sources(source_dir):
+    """Fichiers .pptx / .docx de l'arbre, triés (fichiers temporaires Word ~$ exclus)"""
+    for path in sorted(Path(source_dir).rglob("*")):
+        if path.suffix.lower() in QUIZ_EXTENSIONS and path.is_file() and not path.name.startswith('~$'):
+            yield path
+
+
+def compile_file(path):
+    """
+    Analyse un fichier avec tous les extracteurs
+
+    Returns:
+        (entrée de la banque, liste des erreurs)
+    """
+    from extract_quiz_from_pptx import (extract_quiz_from_pptx, extract_quiz_questions,
+                                        extract_raw_text_from_docx, extract_raw_text_from_pptx)
+
+    stat = os.stat(path)
+    file_type = path.suffix.lower().lstrip('.')
+    errors = []
+    entry = {
+        'type': file_type,
+        'sha256': file_sha256(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns
+    }
+
+    raw = extract_raw_text_from_docx(path) if file_type == 'docx' else extract_raw_text_from_pptx(path)
+    if raw['success']:
+        entry['raw_text'] = raw['raw_text']
+        entry['highlighted'] = [line for line in raw['raw_text'].split('\n') if '✅' in line]
+    else:
+        errors.append(f"texte brut: {raw['error']}")
+
+    quiz = extract_quiz_from_pptx(path)  # gère aussi les .docx
+    if quiz['success']:
+        entry['quiz'] = {
+            'total_questions': quiz['total_questions'],
+            'questions': quiz['questions'],
+            'formatted_content': quiz['formatted_content']
+        }
+    else:
+        errors.append(f"quiz: {quiz['error']}")
+
+    if file_type == 'pptx':
+        try:
+            entry['questions'] = extract_quiz_questions(path)
+        except Exception as e:
+            errors.append(f"questions: {e}")
+
+    return entry, errors
+
+
+def _compile_job(path):
+    """Tâche d'un worker : (entrée ou None, erreurs, durée en secondes)"""
+    start = time.perf_counter()
+    try:
+        entry, errors = compile_file(Path(path))
+    except Exception as e:
+        entry, errors = None, [str(e)]
+    return entry, errors, time.perf_counter() - start
+
+
+def build_quiz_bank(source_dir=DEFAULT_SOURCE, output=DEFAULT_BANK_PATH, workers=1):
+    """
+    Construit la banque de quiz (remplacement atomique de output)
+
+    Args:
+        workers: nombre de processus d'analyse (1 = dans le processus courant)
+
+    Returns:
+        (nombre de fichiers, dict chemin relatif → erreurs, rapport par fichier)
+    """
+    paths = list(iter_quiz_sources(source_dir))
+    if workers > 1 and len(paths) > 1:
+        # spawn : pas d'état hérité du processus parent (comme recommendation_pool)
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths)),
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            # map conserve l'ordre des chemins : fusion déterministe
+            outcomes = list(executor.map(_compile_job, [str(path) for path in paths]))
+    else:
+        outcomes = [_compile_job(str(path)) for path in paths]
+
+    files, errors, report = {}, {}, []
+    for path, (entry, file_errors, seconds) in zip(paths, outcomes):
+        key = path.relative_to(source_dir).as_posix()
+        if entry is not None:
+            files[key] = entry
+        if file_errors:
+            errors[key] = file_errors
+        report.append({
+            'file': key,
+            'seconds': seconds,
+            'questions': entry['quiz']['total_questions'] if entry and 'quiz' in entry else 0,
+            'errors': file_errors
+        })
+
+    bank = {'version': BANK_VERSION, 'files': files, 'errors': errors}
+    tmp_path = output + ".tmp"
+    with open(tmp_path, 'wb') as raw_file:
+        # mtime=0 : deux constructions sur les mêmes sources donnent le même fichier
+        with gzip.GzipFile(filename='', mode='wb', fileobj=raw_file, mtime=0) as f:
+            f.write(json.dumps(bank, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        raw_file.flush()
+        os.fsync(raw_file.fileno())
+    os.replace(tmp_path, output)
+    return len(files), errors, report
+
+
+class QuizBank:
+    """
+    Accès aux fichiers de quiz précompilés, avec repli sur les extracteurs
+
+    Les méthodes retournent le même format que les extracteurs de
+    extract_quiz_from_pptx.py. Les résultats sont partagés : ne pas les modifier.
+    """
+
+    def __init__(self, base_dir, files=None):
+        self.base_dir = Path(base_dir).resolve()
+        self.files = files or {}
+
+    @classmethod
+    def load(cls, base_dir, path=DEFAULT_BANK_PATH):
+        """
+        Charge la banque et écarte les entrées dont le fichier source a changé
+
+        La taille puis la date de modification sont comparées ; si seule la
+        date diffère (copie de fichiers), l'empreinte SHA-256 tranche.
+        """
+        if not os.path.exists(path):
+            print(f"⚠️ Banque de quiz {path} absente : les fichiers seront analysés à la demande "
+                  f"('python quiz_bank.py build')")
+            return cls(base_dir)
+        try:
+            with gzip.open(path, 'rb') as f:
+                bank = json.loads(f.read().decode('utf-8'))
+        except Exception as e:
+            print(f"⚠️ Erreur lors du chargement de {path}: {e}")
+            return cls(base_dir)
+        if bank.get('version') != BANK_VERSION:
+            print(f"⚠️ Banque de quiz {path} d'une autre version, ignorée")
+            return cls(base_dir)
+
+        files, stale = {}, 0
+        for key, entry in bank['files'].items():
+            source = Path(base_dir) / key
+            try:
+                stat = os.stat(source)
+                fresh = stat.st_size == entry['size'] and (
+                    stat.st_mtime_ns == entry['mtime_ns'] or file_sha256(source) == entry['sha256'])
+            except OSError:
+                fresh = False
+            if fresh:
+                files[key] = entry
+            else:
+                stale += 1
+        print(f"✅ Banque de quiz chargée: {len(files)} fichiers"
+              + (f" ({stale} modifiés depuis la construction, analysés à la demande)" if stale else ""))
+        return cls(base_dir, files)
+
+    def lookup(self, file_path):
+        """Entrée de la banque pour un fichier (None s'il faut l'analyser)"""
+        try:
+            key = Path(file_path).resolve().relative_to(self.base_dir).as_posix()
+        except ValueError:
+            return None
+        return self.files.get(key)
+
+    def __len__(self):
+        return len(self.files)
+
+    def raw_text(self, file_path):
+        """Texte brut avec réponses surlignées marquées (format extract_raw_text_from_*)"""
+        entry = self.lookup(file_path)
+        if entry is not None and 'raw_text' in entry:
+            return {'success': True, 'raw_text': entry['raw_text'], 'file': Path(file_path).name}
+
+        from extract_quiz_from_pptx import extract_raw_text_from_docx, extract_raw_text_from_pptx
+        if str(file_path).endswith('.docx'):
+            return extract_raw_text_from_docx(file_path)
+        return extract_raw_text_from_pptx(file_path)
+
+    def quiz(self, file_path):
+        """Questions du quiz (format extract_quiz_from_pptx)"""
+        entry = self.lookup(file_path)
+        if entry is not None and 'quiz' in entry:
+            return {'success': True, 'file': Path(file_path).name, **entry['quiz']}
+
+        from extract_quiz_from_pptx import extract_quiz_from_pptx
+        return extract_quiz_from_pptx(file_path)
+
+    def quiz_questions(self, file_path):
+        """Questions d'un quiz PowerPoint pour l'API des quiz (format extract_quiz_questions)"""
+        entry = self.lookup(file_path)
+        if entry is not None and 'questions' in entry:
+            return entry['questions']
+
+        from extract_quiz_from_pptx import extract_quiz_questions
+        return extract_quiz_questions(file_path)
+
+
+def load_quiz_bank(base_dir=DEFAULT_SOURCE):
+    """Banque désignée par QUIZ_BANK_PATH (défaut quiz_bank.json.gz)"""
+    return QuizBank.load(base_dir, os.getenv("QUIZ_BANK_PATH", DEFAULT_BANK_PATH))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Banque de quiz précompilée")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Analyse tous les supports et écrit la banque")
+    build.add_argument("--source", default=DEFAULT_SOURCE, help="Répertoire des supports de cours")
+    build.add_argument("--out", default=DEFAULT_BANK_PATH, help="Fichier de sortie")
+    build.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processus d'analyse")
+    build.add_argument("--strict", action="store_true", help="Échec si un fichier ne peut pas être analysé")
+    build.add_argument("--quiet", action="store_true", help="N'affiche pas le détail par fichier")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count, errors, report = build_quiz_bank(args.source, args.out, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    for item in report:
+        if not args.quiet:
+            print(f"   {item['seconds'] * 1000:8.1f} ms  {item['questions']:3d} questions  {item['file']}")
+        for error in item['errors']:
+            print(f"❌ {item['file']}: {error}")
+    busy = sum(item['seconds'] for item in report)
+    print(f"✅ {count} fichiers compilés dans {args.out} "
+          f"({os.path.getsize(args.out) / 1024:.0f} Ko, {elapsed:.1f}s avec {args.workers} workers, "
+          f"{busy:.1f}s d'analyse cumulée, {sum(item['questions'] for item in report)} questions)")
+    if errors:
+        print(f"⚠️ {len(errors)} fichiers en erreur")
+        if args.strict:
+            raise SystemExit(1)
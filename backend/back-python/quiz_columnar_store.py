@@ -0,0 +1,286 @@
+"""
+Stockage en colonnes des résultats de quiz pour l'analyse de cohortes
+
+Chaque champ utile aux statistiques est écrit dans un fichier binaire à
+largeur fixe (une valeur par résultat) :
+- student.bin    int32           indice de l'étudiant (identifiants internés)
+- subskill.bin   int16           indice du sous-acquis
+- score.bin      float32         score entre 0 et 1
+- mastered.bin   bool            cours maîtrisé
+- timestamp.bin  datetime64[us]  date du passage (heure locale, sans fuseau)
+
+meta.json contient le nombre de lignes et les tables d'internement. Les
+colonnes sont ouvertes avec np.memmap : l'ouverture ne lit pas les données
+et les agrégations (totaux, taux de maîtrise par sous-acquis, filtres de
+dates) sont des parcours vectorisés.
+
+Les ajouts écrivent d'abord les colonnes puis remplacent meta.json : un
+lecteur ne voit jamais que des lignes complètes.
+
+Il s'agit d'un export à un instant donné, pour les analyses hors ligne :
+l'API n'écrit pas dans ces colonnes et ne les lit pas. Les évaluations
+enregistrées après le build (journal JSON ou base SQLite) n'y figurent
+pas : relancer build pour rafraîchir l'export.
+
+Usage:
+    python quiz_columnar_store.py build --data-dir . --out quiz_columns
+    python quiz_columnar_store.py stats --path quiz_columns [--since 2025-01-01] [--until ...] [--student ID]
+"""
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+COLUMNS = {
+    "student": np.dtype(np.int32),
+    "subskill": np.dtype(np.int16),
+    "score": np.dtype(np.float32),
+    "mastered": np.dtype(np.bool_),
+    "timestamp": np.dtype("datetime64[us]"),
+}
+
+# Nombre de résultats convertis en tableaux à la fois lors d'un ajout
+CHUNK_SIZE = 65536
+
+
+def to_datetime64(timestamp):
+    """
+    Convertit un timestamp ISO 8601 en datetime64[us]
+
+    Les timestamps sans fuseau (datetime.now().isoformat()) sont gardés tels
+    quels ; ceux avec fuseau sont ramenés à l'heure locale.
+    """
+    value = datetime.fromisoformat(timestamp)
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return np.datetime64(value, "us")
+
+
+class ColumnarResultStore:
+    """Résultats de quiz en colonnes mappées en mémoire (export hors ligne, lecture + ajout)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.meta_file = os.path.join(path, "meta.json")
+        with open(self.meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Format de {path} non supporté (version {meta.get('version')})")
+        self.rows = meta["rows"]
+        self.students = meta["students"]
+        self.subskills = meta["subskills"]
+        self.student_index = {student_id: i for i, student_id in enumerate(self.students)}
+        self.subskill_index = {subskill_id: i for i, subskill_id in enumerate(self.subskills)}
+        self._map_columns()
+
+    @classmethod
+    def build(cls, results, path):
+        """
+        Crée (ou remplace) un stockage en colonnes à partir de résultats
+
+        Args:
+            results: itérable de résultats au format de quiz_results.json
+            path: répertoire de destination
+        """
+        os.makedirs(path, exist_ok=True)
+        meta_file = os.path.join(path, "meta.json")
+        # Sans meta.json le répertoire est illisible : pas de mélange ancien/nouveau
+        if os.path.exists(meta_file):
+            os.remove(meta_file)
+        for name in COLUMNS:
+            open(os.path.join(path, f"{name}.bin"), 'wb').close()
+        _write_meta(meta_file, {"version": FORMAT_VERSION, "rows": 0, "students": [], "subskills": []})
+        store = cls(path)
+        store.append(results)
+        return store
+
+    def _map_columns(self):
+        self.columns = {}
+        for name, dtype in COLUMNS.items():
+            if self.rows:
+                self.columns[name] = np.memmap(os.path.join(self.path, f"{name}.bin"),
+                                               dtype=dtype, mode='r', shape=(self.rows,))
+            else:
+                self.columns[name] = np.empty(0, dtype=dtype)
+
+    def append(self, results):
+        """
+        Ajoute des résultats à la fin des colonnes
+
+        Returns:
+            nombre de résultats ajoutés
+        """
+        added = 0
+        chunk = []
+        for result in results:
+            chunk.append(result)
+            if len(chunk) >= CHUNK_SIZE:
+                added += self._append_chunk(chunk)
+                chunk = []
+        if chunk:
+            added += self._append_chunk(chunk)
+        return added
+
+    def _append_chunk(self, results):
+        arrays = {
+            "student": np.fromiter((self._intern(self.student_index, self.students, r["student_id"])
+                                    for r in results), dtype=COLUMNS["student"], count=len(results)),
+            "subskill": np.fromiter((self._intern(self.subskill_index, self.subskills, r["subskill_id"])
+                                     for r in results), dtype=COLUMNS["subskill"], count=len(results)),
+            "score": np.fromiter((r["score"] for r in results), dtype=COLUMNS["score"], count=len(results)),
+            "mastered": np.fromiter((r["is_mastered"] for r in results),
+                                    dtype=COLUMNS["mastered"], count=len(results)),
+            "timestamp": np.array([to_datetime64(r["timestamp"]) for r in results], dtype=COLUMNS["timestamp"]),
+        }
+        for name, array in arrays.items():
+            column_file = os.path.join(self.path, f"{name}.bin")
+            with open(column_file, 'r+b') as f:
+                # Tronquer un éventuel ajout interrompu avant d'écrire
+                f.truncate(self.rows * COLUMNS[name].itemsize)
+                f.seek(0, os.SEEK_END)
+                array.tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+        self.rows += len(results)
+        _write_meta(self.meta_file, {
+            "version": FORMAT_VERSION,
+            "rows": self.rows,
+            "students": self.students,
+            "subskills": self.subskills
+        })
+        self._map_columns()
+        return len(results)
+
+    @staticmethod
+    def _intern(index, values, value):
+        position = index.get(value)
+        if position is None:
+            position = index[value] = len(values)
+            values.append(value)
+        return position
+
+    # ------------------------------------------------------------------
+    # Agrégations
+    # ------------------------------------------------------------------
+
+    def _selection(self, student_id=None, since=None, until=None):
+        """
+        Masque des lignes retenues (None = toutes les lignes)
+
+        since est inclusif, until exclusif (timestamps ISO 8601).
+        """
+        mask = None
+        if student_id is not None:
+            position = self.student_index.get(student_id)
+            if position is None:
+                return np.zeros(self.rows, dtype=bool)
+            mask = self.columns["student"] == position
+        timestamps = self.columns["timestamp"]
+        if since is not None:
+            condition = timestamps >= to_datetime64(since)
+            mask = condition if mask is None else mask & condition
+        if until is not None:
+            condition = timestamps < to_datetime64(until)
+            mask = condition if mask is None else mask & condition
+        return mask
+
+    def get_totals(self, student_id=None, since=None, until=None):
+        """(nombre de résultats, somme des scores, nombre de cours maîtrisés)"""
+        mask = self._selection(student_id, since, until)
+        scores, mastered = self.columns["score"], self.columns["mastered"]
+        if mask is not None:
+            scores, mastered = scores[mask], mastered[mask]
+        return (int(scores.shape[0]),
+                float(scores.sum(dtype=np.float64)),
+                int(np.count_nonzero(mastered)))
+
+    def get_subskill_totals(self, student_id=None, since=None, until=None):
+        """dict sous-acquis → (nombre de résultats, somme des scores, nombre maîtrisés)"""
+        mask = self._selection(student_id, since, until)
+        subskills, scores, mastered = (self.columns["subskill"], self.columns["score"],
+                                       self.columns["mastered"])
+        if mask is not None:
+            subskills, scores, mastered = subskills[mask], scores[mask], mastered[mask]
+        size = len(self.subskills)
+        counts = np.bincount(subskills, minlength=size)
+        score_sums = np.bincount(subskills, weights=scores, minlength=size)
+        mastered_counts = np.bincount(subskills, weights=mastered, minlength=size)
+        return {
+            subskill_id: (int(counts[i]), float(score_sums[i]), int(mastered_counts[i]))
+            for i, subskill_id in enumerate(self.subskills) if counts[i]
+        }
+
+    def get_mastery_rates(self, since=None, until=None):
+        """dict sous-acquis → taux de maîtrise (%)"""
+        return {
+            subskill_id: mastered / total * 100
+            for subskill_id, (total, _, mastered) in self.get_subskill_totals(since=since, until=until).items()
+        }
+
+    def get_student_totals(self, since=None, until=None):
+        """dict étudiant → (nombre de résultats, somme des scores, nombre maîtrisés)"""
+        mask = self._selection(None, since, until)
+        students, scores, mastered = (self.columns["student"], self.columns["score"],
+                                      self.columns["mastered"])
+        if mask is not None:
+            students, scores, mastered = students[mask], scores[mask], mastered[mask]
+        size = len(self.students)
+        counts = np.bincount(students, minlength=size)
+        score_sums = np.bincount(students, weights=scores, minlength=size)
+        mastered_counts = np.bincount(students, weights=mastered, minlength=size)
+        return {
+            student_id: (int(counts[i]), float(score_sums[i]), int(mastered_counts[i]))
+            for i, student_id in enumerate(self.students) if counts[i]
+        }
+
+
+def _write_meta(path, meta):
+    """Remplace meta.json de façon atomique"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Stockage en colonnes des résultats de quiz")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Construit les colonnes à partir du stockage des quiz")
+    build.add_argument("--data-dir", default=".", help="Répertoire des fichiers JSON / de la base")
+    build.add_argument("--backend", default=None, help="json ou sqlite (défaut: QUIZ_STORAGE)")
+    build.add_argument("--out", default="quiz_columns", help="Répertoire de destination")
+    stats = subparsers.add_parser("stats", help="Statistiques calculées sur les colonnes")
+    stats.add_argument("--path", default="quiz_columns")
+    stats.add_argument("--student", default=None)
+    stats.add_argument("--since", default=None, help="Timestamp ISO 8601 inclusif")
+    stats.add_argument("--until", default=None, help="Timestamp ISO 8601 exclusif")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        from quiz_storage import create_storage
+
+        storage = create_storage(args.data_dir, args.backend)
+        start = time.perf_counter()
+        store = ColumnarResultStore.build(storage.iter_results(), args.out)
+        print(f"✅ {store.rows} résultats écrits dans {args.out} "
+              f"({len(store.students)} étudiants, {time.perf_counter() - start:.2f}s)")
+    else:
+        start = time.perf_counter()
+        store = ColumnarResultStore(args.path)
+        total, score_sum, mastered = store.get_totals(args.student, args.since, args.until)
+        print(f"📊 {total} résultats, score moyen {score_sum / total * 100 if total else 0:.1f}%, "
+              f"taux de maîtrise {mastered / total * 100 if total else 0:.1f}%")
+        for subskill_id, (count, _, subskill_mastered) in sorted(
+                store.get_subskill_totals(args.student, args.since, args.until).items()):
+            print(f"   {subskill_id}: {count} tentatives, "
+                  f"maîtrise {subskill_mastered / count * 100:.1f}%")
+        print(f"⏱️ {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -1,115 +1,45 @@
 """
 Système de scoring des quiz et identification des sous-acquis
+
+La persistance est déléguée à un QuizStorage (voir quiz_storage.py).
 """
 
+import base64
 import json
-import os
 from datetime import datetime
-from pathlib import Path
+
+from quiz_storage import FAILED, PERSISTED, create_storage
+from quiz_windows import WINDOWS
+from subskill_bitset import COURSE_TO_SUBSKILL
 
 class QuizScorer:
     """Gère le scoring des quiz et l'identification des sous-acquis non maîtrisés"""
 
-    # Mapping cours → sous-acquis
-    # Chaque cours correspond à un sous-acquis spécifique
-    COURSE_TO_SUBSKILL = {
-        (1, 1): "1.1",  # Cours 1, Partie 1 → Sous-acquis 1.1
-        (1, 2): "1.2",
-        (1, 3): "1.3",
-        (1, 4): "1.4",
-        (1, 5): "1.5",
-        (1, 6): "1.6",
-        (1, 7): "1.7",
-        (2, 1): "2.1",
-        (2, 2): "2.2",
-        (2, 3): "2.3",
-        (3, 1): "3.1",
-        (3, 2): "3.2",
-        (3, 3): "3.3",
-        (3, 4): "3.4",
-        (4, 1): "4.1",
-        (4, 2): "4.2",
-        (4, 3): "4.3",
-        (4, 4): "4.4",
-        (4, 5): "4.5",
-        (4, 6): "4.6",
-        (4, 7): "4.7",
-        (4, 8): "4.8",
-        (4, 9): "4.9",
-        (5, 1): "5.1",
-        (5, 2): "5.2",
-        (5, 3): "5.3",
-        (5, 4): "5.4",
-        (5, 5): "5.5",
-        (5, 6): "5.6",
-        (5, 7): "5.7",
-        (6, 1): "6.1",
-        (6, 2): "6.2",
-        (6, 3): "6.3",
-        (7, 1): "7.1",
-        (7, 2): "7.2",
-        (7, 3): "7.3",
-        (8, 1): "8.1",
-        (8, 2): "8.2",
-        (8, 3): "8.3",
-        (8, 4): "8.4",
-        (8, 5): "8.5",
-        (8, 6): "8.6",
-    }
+    # Mapping cours → sous-acquis (voir subskill_bitset.COURSE_TO_SUBSKILL)
+    COURSE_TO_SUBSKILL = COURSE_TO_SUBSKILL
 
     # Seuil de réussite (score minimum pour considérer un cours comme maîtrisé)
     MASTERY_THRESHOLD = 0.80  # 80%
 
-    def __init__(self, data_dir="./"):
+    # Avance tolérée (secondes) d'un timestamp fourni sur l'horloge du serveur
+    TIMESTAMP_TOLERANCE = 300
+
+    def __init__(self, data_dir="./", storage=None):
         self.data_dir = data_dir
-        self.students_file = os.path.join(data_dir, "students_profiles.json")
-        self.results_file = os.path.join(data_dir, "quiz_results.json")
+        # Backend choisi par QUIZ_STORAGE (fichiers JSON par défaut)
+        self.storage = storage or create_storage(data_dir)
 
-        # Charger ou créer les fichiers de données
-        self.students_data = self._load_students()
-        self.results_data = self._load_results()
+    def start(self):
+        """Démarre les tâches de fond du stockage"""
+        self.storage.start()
 
-    def _load_students(self):
-        """Charge le fichier students_profiles.json"""
-        if os.path.exists(self.students_file):
-            try:
-                with open(self.students_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"⚠️ Erreur lors du chargement de {self.students_file}: {e}")
-                return []
-        return []
-
-    def _load_results(self):
-        """Charge l'historique des résultats de quiz"""
-        if os.path.exists(self.results_file):
-            try:
-                with open(self.results_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"⚠️ Erreur lors du chargement de {self.results_file}: {e}")
-                return []
-        return []
-
-    def _save_students(self):
-        """Sauvegarde students_profiles.json"""
-        try:
-            with open(self.students_file, 'w', encoding='utf-8') as f:
-                json.dump(self.students_data, f, indent=4, ensure_ascii=False)
-            return True
-        except Exception as e:
-            print(f"❌ Erreur lors de la sauvegarde de {self.students_file}: {e}")
-            return False
-
-    def _save_results(self):
-        """Sauvegarde quiz_results.json"""
-        try:
-            with open(self.results_file, 'w', encoding='utf-8') as f:
-                json.dump(self.results_data, f, indent=4, ensure_ascii=False)
-            return True
-        except Exception as e:
-            print(f"❌ Erreur lors de la sauvegarde de {self.results_file}: {e}")
-            return False
+    def close(self):
+        """Termine les écritures en cours (à appeler à l'arrêt)"""
+        self.storage.close()
+
+    def get_storage_metrics(self):
+        """Métriques de persistance (file d'écriture, délai d'écriture, durabilité)"""
+        return self.storage.metrics()
 
     def calculate_score(self, total_questions, correct_answers):
         """Calcule le score en pourcentage"""
@@ -132,6 +62,92 @@ class QuizScorer:
         Returns:
             dict avec score, sous-acquis affecté, et recommandation
         """
+        result_entry = self._build_result_entry(student_id, course_number, part_number,
+                                                total_questions, correct_answers)
+        if "error" in result_entry:
+            return result_entry
+
+        # Enregistrer le résultat et mettre à jour le profil de l'étudiant
+        _, status = self.storage.record_result(result_entry)
+
+        return self._evaluation_response(result_entry, status)
+
+    def evaluate_many(self, evaluations):
+        """
+        Évalue un lot de quiz (par exemple après une session d'examen hors ligne)
+
+        Toutes les entrées sont validées, les profils sont mis à jour en
+        mémoire dans l'ordre du lot, puis le tout est persisté en une seule
+        écriture (ou transaction).
+
+        Args:
+            evaluations: liste de dicts avec student_id, course_number,
+                         part_number, total_questions, correct_answers et
+                         éventuellement timestamp (ISO 8601) du passage du quiz
+
+        Returns:
+            dict avec les compteurs du lot, le statut de persistance du lot
+            ("persistence", voir QuizStorage.record_results) et un résultat
+            par entrée (même ordre)
+        """
+        outcomes = [None] * len(evaluations)
+        accepted = []  # (indice, résultat à enregistrer)
+        for index, evaluation in enumerate(evaluations):
+            error = self._validate_evaluation(evaluation)
+            if error is None:
+                result_entry = self._build_result_entry(
+                    evaluation["student_id"], evaluation["course_number"], evaluation["part_number"],
+                    evaluation["total_questions"], evaluation["correct_answers"],
+                    timestamp=evaluation.get("timestamp")
+                )
+                error = result_entry.get("error")
+            if error is not None:
+                outcomes[index] = {"index": index, "error": error}
+            else:
+                accepted.append((index, result_entry))
+
+        status = PERSISTED
+        if accepted:
+            _, status = self.storage.record_results([entry for _, entry in accepted])
+        for index, result_entry in accepted:
+            outcomes[index] = {"index": index, **self._evaluation_response(result_entry, status)}
+
+        return {
+            "total": len(evaluations),
+            "evaluated": len(accepted),
+            "failed": len(evaluations) - len(accepted),
+            "persisted": status == PERSISTED,
+            "persistence": status,
+            "results": outcomes
+        }
+
+    def _validate_evaluation(self, evaluation):
+        """Retourne un message d'erreur si l'entrée d'un lot est invalide, sinon None"""
+        for field in ("student_id", "course_number", "part_number", "total_questions", "correct_answers"):
+            if evaluation.get(field) is None:
+                return f"Champ manquant: {field}"
+        if not isinstance(evaluation["student_id"], str):
+            return "student_id doit être une chaîne"
+        for field in ("course_number", "part_number", "total_questions", "correct_answers"):
+            # bool est une sous-classe de int : True/False ne sont pas des nombres valides ici
+            if not isinstance(evaluation[field], int) or isinstance(evaluation[field], bool):
+                return f"{field} doit être un entier"
+        if not 0 <= evaluation["correct_answers"] <= evaluation["total_questions"]:
+            return "correct_answers doit être compris entre 0 et total_questions"
+        if evaluation.get("timestamp") is not None:
+            if not isinstance(evaluation["timestamp"], str):
+                return "timestamp doit être une chaîne ISO 8601"
+            try:
+                timestamp = normalize_timestamp(evaluation["timestamp"])
+            except (TypeError, ValueError):
+                return f"Timestamp invalide: {evaluation['timestamp']}"
+            if (datetime.fromisoformat(timestamp) - datetime.now()).total_seconds() > self.TIMESTAMP_TOLERANCE:
+                return f"Timestamp dans le futur: {evaluation['timestamp']}"
+        return None
+
+    def _build_result_entry(self, student_id, course_number, part_number,
+                            total_questions, correct_answers, timestamp=None):
+        """Construit l'entrée de quiz_results (ou un dict d'erreur si le cours est inconnu)"""
         # Calculer le score
         score = self.calculate_score(total_questions, correct_answers)
         percentage = score * 100
@@ -148,8 +164,7 @@ class QuizScorer:
         # Déterminer si le cours est maîtrisé
         is_mastered = score >= self.MASTERY_THRESHOLD
 
-        # Enregistrer le résultat
-        result_entry = {
+        return {
             "student_id": student_id,
             "course": f"{course_number}.{part_number}",
             "subskill_id": subskill_id,
@@ -158,60 +173,31 @@ class QuizScorer:
             "score": score,
             "percentage": percentage,
             "is_mastered": is_mastered,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": normalize_timestamp(timestamp) if timestamp else datetime.now().isoformat()
         }
-        self.results_data.append(result_entry)
-        self._save_results()
 
-        # Mettre à jour le profil de l'étudiant
-        student_updated = self._update_student_profile(
-            student_id, subskill_id, is_mastered
-        )
+    def _evaluation_response(self, result_entry, status):
+        """
+        Réponse de l'API pour un résultat enregistré
 
+        status est le statut de persistance du stockage ("persisted",
+        "pending" : appliqué mais pas encore écrit, ou "failed")
+        """
         return {
-            "student_id": student_id,
-            "course": f"{course_number}.{part_number}",
-            "subskill_id": subskill_id,
-            "total_questions": total_questions,
-            "correct_answers": correct_answers,
-            "score": score,
-            "percentage": percentage,
-            "is_mastered": is_mastered,
+            "student_id": result_entry["student_id"],
+            "course": result_entry["course"],
+            "subskill_id": result_entry["subskill_id"],
+            "total_questions": result_entry["total_questions"],
+            "correct_answers": result_entry["correct_answers"],
+            "score": result_entry["score"],
+            "percentage": result_entry["percentage"],
+            "is_mastered": result_entry["is_mastered"],
             "threshold": self.MASTERY_THRESHOLD * 100,
-            "student_profile_updated": student_updated,
-            "message": self._get_feedback_message(score)
+            "student_profile_updated": status != FAILED,
+            "persistence": status,
+            "message": self._get_feedback_message(result_entry["score"])
         }
 
-    def _update_student_profile(self, student_id, subskill_id, is_mastered):
-        """Met à jour le profil de l'étudiant dans students_profiles.json"""
-        # Chercher l'étudiant
-        student = None
-        for s in self.students_data:
-            if s["student_id"] == student_id:
-                student = s
-                break
-
-        # Créer l'étudiant s'il n'existe pas
-        if not student:
-            student = {
-                "student_id": student_id,
-                "sous_acquis": []
-            }
-            self.students_data.append(student)
-
-        # Mettre à jour la liste des sous-acquis
-        if not is_mastered:
-            # Ajouter le sous-acquis s'il n'est pas déjà dans la liste
-            if subskill_id not in student["sous_acquis"]:
-                student["sous_acquis"].append(subskill_id)
-        else:
-            # Retirer le sous-acquis s'il était dans la liste
-            if subskill_id in student["sous_acquis"]:
-                student["sous_acquis"].remove(subskill_id)
-
-        # Sauvegarder
-        return self._save_students()
-
     def _get_feedback_message(self, score):
         """Génère un message de feedback selon le score"""
         percentage = score * 100
@@ -229,33 +215,71 @@ class QuizScorer:
         else:
             return "❌ Résultat faible. Il est recommandé de réviser ce cours en profondeur."
 
+    def find_student_profile(self, student_id):
+        """Profil d'un étudiant, ou None s'il n'a encore passé aucun quiz"""
+        return self.storage.get_profile(student_id)
+
     def get_student_profile(self, student_id):
         """Récupère le profil complet d'un étudiant"""
-        for student in self.students_data:
-            if student["student_id"] == student_id:
-                return student
+        student = self.find_student_profile(student_id)
+        if student is not None:
+            return student
 
         # Créer un nouveau profil si l'étudiant n'existe pas
         return {
             "student_id": student_id,
-            "sous_acquis": []
+            "sous_acquis": [],
+            "sous_acquis_mask": 0
         }
 
-    def get_student_history(self, student_id):
-        """Récupère l'historique des quiz d'un étudiant"""
-        history = [r for r in self.results_data if r["student_id"] == student_id]
-        # Trier par date (plus récent en premier)
-        history.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-        return history
+    def get_student_history(self, student_id, limit=None):
+        """Récupère l'historique des quiz d'un étudiant (plus récent en premier)"""
+        return [result for _, result in self.storage.get_history(student_id, limit=limit)]
+
+    def get_history_page(self, student_id, limit, cursor=None):
+        """
+        Page de l'historique d'un étudiant (plus récent en premier)
+
+        Args:
+            limit: nombre de résultats par page
+            cursor: curseur opaque retourné pour la page précédente
+
+        Returns:
+            (résultats, curseur de la page suivante ou None)
+
+        Raises:
+            ValueError si le curseur est invalide
+        """
+        before = decode_history_cursor(cursor) if cursor else None
+        # Un résultat de plus pour savoir s'il reste une page
+        entries = self.storage.get_history(student_id, limit=limit + 1, before=before)
+        page = entries[:limit]
+        next_cursor = None
+        if len(entries) > limit:
+            position, result = page[-1]
+            next_cursor = encode_history_cursor(result["timestamp"], position)
+        return [result for _, result in page], next_cursor
+
+    def list_student_ids(self):
+        """Identifiants de tous les étudiants ayant un profil"""
+        return self.storage.list_student_ids()
+
+    def count_students(self):
+        return self.storage.count_students()
+
+    def get_subskill_counts(self):
+        """Nombre d'étudiants n'ayant pas maîtrisé chaque sous-acquis (compteurs en direct)"""
+        return self.storage.subskill_counts()
+
+    def get_most_difficult_subskills(self, n=10):
+        """[(sous-acquis, nombre d'étudiants)] : les n sous-acquis les moins maîtrisés"""
+        return self.storage.most_struggling(n)
 
     def get_statistics(self, student_id=None):
         """Obtient des statistiques globales ou pour un étudiant"""
-        if student_id:
-            results = [r for r in self.results_data if r["student_id"] == student_id]
-        else:
-            results = self.results_data
+        total, score_sum, mastered = self.storage.get_totals(student_id)
 
-        if not results:
+        if not total:
             return {
                 "total_quizzes": 0,
                 "average_score": 0,
@@ -263,9 +287,7 @@ class QuizScorer:
                 "not_mastered_count": 0
             }
 
-        total = len(results)
-        avg_score = sum(r["score"] for r in results) / total
-        mastered = sum(1 for r in results if r["is_mastered"])
+        avg_score = score_sum / total
         not_mastered = total - mastered
 
         return {
@@ -277,15 +299,74 @@ class QuizScorer:
             "mastery_rate": (mastered / total * 100) if total > 0 else 0
         }
 
+    def get_subskill_statistics(self):
+        """Tentatives et taux de maîtrise de chaque sous-acquis"""
+        return self._format_subskill_totals(self.storage.get_subskill_totals())
+
+    def get_windowed_statistics(self, windows=None):
+        """
+        Tentatives et taux de maîtrise par sous-acquis sur des fenêtres glissantes
+
+        Args:
+            windows: noms des fenêtres ("day", "week", "month") ; toutes par défaut
 
-# Fonction helper pour utilisation dans l'API
-def evaluate_quiz_result(student_id, course_number, part_number,
-                        total_questions, correct_answers, data_dir="./"):
+        Returns:
+            dict fenêtre → totaux de la fenêtre et "subskills" (détail par sous-acquis)
+        """
+        statistics = {}
+        for window in windows or WINDOWS:
+            totals = self.storage.get_window_totals(window)
+            attempts = sum(count for count, _, _ in totals.values())
+            mastered = sum(mastered for _, _, mastered in totals.values())
+            statistics[window] = {
+                "attempts": attempts,
+                "mastered_count": mastered,
+                "mastery_rate": (mastered / attempts * 100) if attempts else 0,
+                "subskills": self._format_subskill_totals(totals)
+            }
+        return statistics
+
+    def _format_subskill_totals(self, subskill_totals):
+        statistics = {}
+        for subskill_id, (total, score_sum, mastered) in subskill_totals.items():
+            if total:
+                statistics[subskill_id] = {
+                    "attempts": total,
+                    "average_percentage": score_sum / total * 100,
+                    "mastered_count": mastered,
+                    "mastery_rate": mastered / total * 100
+                }
+        return statistics
+
+
+def normalize_timestamp(timestamp):
     """
-    Fonction helper pour évaluer un quiz depuis l'API
+    Timestamp ISO 8601 ramené à l'heure locale sans fuseau
+
+    Les résultats sont indexés et comparés comme des chaînes (historique,
+    curseurs, ORDER BY timestamp, iter_results(since)) : tous doivent avoir
+    le format de datetime.now().isoformat(). Comme to_datetime64 dans
+    quiz_columnar_store.py, un timestamp avec fuseau est converti.
     """
-    scorer = QuizScorer(data_dir)
-    return scorer.evaluate_quiz(
-        student_id, course_number, part_number,
-        total_questions, correct_answers
-    )
+    value = datetime.fromisoformat(timestamp)
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.isoformat()
+
+
+def encode_history_cursor(timestamp, position):
+    """Curseur opaque de pagination de l'historique : clé (timestamp, position)"""
+    payload = json.dumps([timestamp, position], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_history_cursor(cursor):
+    """(timestamp, position) d'un curseur ; ValueError s'il est invalide"""
+    try:
+        timestamp, position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Curseur invalide: {cursor}") from e
+    if not isinstance(timestamp, str) or not isinstance(position, int):
+        raise ValueError(f"Curseur invalide: {cursor}")
+    return timestamp, position
+
@@ -0,0 +1,1265 @@
+"""
+Persistance des résultats de quiz et des profils étudiants
+
+QuizScorer délègue le stockage à une implémentation de QuizStorage :
+- JsonLogStorage : instantanés students_profiles.json / quiz_results.json
+  et journal append-only quiz_events.jsonl (compaction en arrière-plan)
+- SQLiteStorage : base SQLite en mode WAL, requêtes indexées par étudiant
+
+Le backend est choisi par la variable d'environnement QUIZ_STORAGE
+("json" par défaut, ou "sqlite" avec QUIZ_DB_PATH). Migration des fichiers
+JSON existants : python quiz_storage.py migrate --data-dir . --db quiz.db
+"""
+
+import bisect
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from operator import itemgetter
+
+from quiz_windows import WindowedStats, cutoff, oldest_bucket, timestamp_bucket, window_buckets
+from subskill_bitset import SUBSKILL_INDEX
+
+# Issue d'un enregistrement (voir QuizStorage.record_results)
+PERSISTED = "persisted"  # acquitté selon la politique de durabilité du backend
+PENDING = "pending"      # appliqué en mémoire, écriture pas encore confirmée
+FAILED = "failed"        # rien n'a été enregistré
+
+
+class StudentProfile:
+    """
+    Profil étudiant en mémoire
+
+    Les sous-acquis sont un dict utilisé comme ensemble ordonné : ajout,
+    retrait et test d'appartenance en O(1), tout en conservant l'ordre de
+    la liste écrite dans students_profiles.json. Le masque de bits des mêmes
+    sous-acquis (positions de SUBSKILL_INDEX) est tenu à jour à chaque
+    résultat et transmis au recommender avec le profil.
+    """
+
+    __slots__ = ("student_id", "sous_acquis", "mask", "extra")
+
+    def __init__(self, student_id, sous_acquis=(), extra=None):
+        self.student_id = student_id
+        self.sous_acquis = dict.fromkeys(sous_acquis)
+        self.mask = SUBSKILL_INDEX.mask(self.sous_acquis)
+        # Autres champs éventuels du fichier, conservés tels quels
+        self.extra = extra or {}
+
+    @classmethod
+    def from_dict(cls, data):
+        extra = {k: v for k, v in data.items() if k not in ("student_id", "sous_acquis")}
+        return cls(data["student_id"], data.get("sous_acquis", []), extra)
+
+    def to_dict(self):
+        """Format de students_profiles.json"""
+        return {"student_id": self.student_id, "sous_acquis": list(self.sous_acquis), **self.extra}
+
+    def to_profile(self):
+        """Profil retourné par get_profile (format du fichier et masque)"""
+        return {**self.to_dict(), "sous_acquis_mask": self.mask}
+
+    def apply_result(self, subskill_id, is_mastered):
+        """
+        Ajoute ou retire le sous-acquis selon le résultat
+
+        Returns:
+            +1 si le sous-acquis a été ajouté, -1 s'il a été retiré, 0 sinon
+        """
+        if not is_mastered:
+            # Ajouter le sous-acquis s'il n'est pas déjà dans la liste
+            if subskill_id in self.sous_acquis:
+                return 0
+            self.sous_acquis[subskill_id] = None
+            self.mask |= SUBSKILL_INDEX.bit(subskill_id)
+            return 1
+        # Retirer le sous-acquis s'il était dans la liste
+        if subskill_id not in self.sous_acquis:
+            return 0
+        del self.sous_acquis[subskill_id]
+        self.mask &= ~SUBSKILL_INDEX.bit(subskill_id)
+        return -1
+
+
+class RunningStats:
+    """Agrégats cumulés d'un ensemble de résultats (mis à jour en O(1))"""
+
+    __slots__ = ("count", "score_sum", "mastered")
+
+    def __init__(self):
+        self.count = 0
+        self.score_sum = 0.0
+        self.mastered = 0
+
+    def add(self, result):
+        self.count += 1
+        self.score_sum += result["score"]
+        self.mastered += 1 if result["is_mastered"] else 0
+
+    def totals(self):
+        return self.count, self.score_sum, self.mastered
+
+
+class SubskillCounter:
+    """
+    Nombre d'étudiants en difficulté par sous-acquis, tenu à jour en direct
+
+    Mis à jour à chaque changement de profil ; most_common sélectionne les
+    n plus grands compteurs avec un tas au lieu de recompter les profils.
+    """
+
+    def __init__(self):
+        self.counts = {}
+
+    def add(self, subskill_id, delta=1):
+        count = self.counts.get(subskill_id, 0) + delta
+        if count > 0:
+            self.counts[subskill_id] = count
+        else:
+            self.counts.pop(subskill_id, None)
+
+    def most_common(self, n=None):
+        """[(sous-acquis, nombre d'étudiants)] par ordre décroissant"""
+        items = list(self.counts.items())
+        if n is None:
+            return sorted(items, key=itemgetter(1), reverse=True)
+        return heapq.nlargest(n, items, key=itemgetter(1))
+
+    def as_dict(self):
+        return dict(self.counts)
+
+
+class QuizStorage:
+    """Interface de stockage utilisée par QuizScorer"""
+
+    def get_profile(self, student_id):
+        """
+        Profil {"student_id", "sous_acquis", "sous_acquis_mask"} ou None si
+        l'étudiant est inconnu (masque : positions de SUBSKILL_INDEX)
+        """
+        raise NotImplementedError
+
+    def list_student_ids(self):
+        """Identifiants de tous les étudiants connus"""
+        raise NotImplementedError
+
+    def count_students(self):
+        raise NotImplementedError
+
+    def subskill_counts(self):
+        """Nombre d'étudiants ayant chaque sous-acquis non maîtrisé"""
+        raise NotImplementedError
+
+    def most_struggling(self, n=10):
+        """[(sous-acquis, nombre d'étudiants)] : les n sous-acquis les moins maîtrisés"""
+        raise NotImplementedError
+
+    def record_result(self, result_entry):
+        """
+        Enregistre un résultat et met à jour le profil de l'étudiant
+
+        Returns:
+            (profil mis à jour, statut de persistance : voir record_results)
+        """
+        profiles, status = self.record_results([result_entry])
+        return profiles[0], status
+
+    def record_results(self, result_entries):
+        """
+        Enregistre un lot de résultats en une seule écriture
+
+        Les profils sont mis à jour dans l'ordre du lot.
+
+        Returns:
+            (profil après chaque résultat, statut de persistance) :
+            - PERSISTED : lot acquitté selon la politique de durabilité
+            - PENDING : lot appliqué (profils, historique et statistiques le
+              reflètent) mais écriture pas encore confirmée ; elle est
+              réessayée, le lot ne doit pas être renvoyé
+            - FAILED : rien n'a été enregistré, le lot peut être renvoyé
+        """
+        raise NotImplementedError
+
+    def get_history(self, student_id, limit=None, before=None):
+        """
+        Résultats d'un étudiant, du plus récent au plus ancien
+
+        L'ordre est (timestamp, position) décroissant, où position est un
+        numéro d'enregistrement unique (position dans le journal JSON, id de
+        la ligne SQLite) : deux résultats au même timestamp restent ordonnés.
+
+        Args:
+            limit: nombre maximal de résultats
+            before: (timestamp, position) : ne retourner que les résultats
+                    strictement antérieurs à cette clé (curseur de pagination)
+
+        Returns:
+            liste de (position, résultat)
+        """
+        raise NotImplementedError
+
+    def get_totals(self, student_id=None):
+        """(nombre de résultats, somme des scores, nombre de cours maîtrisés)"""
+        raise NotImplementedError
+
+    def get_subskill_totals(self):
+        """dict sous-acquis → (nombre de résultats, somme des scores, nombre maîtrisés)"""
+        raise NotImplementedError
+
+    def get_window_totals(self, window):
+        """
+        Agrégats par sous-acquis sur une fenêtre glissante (voir quiz_windows.py)
+
+        Args:
+            window: nom de la fenêtre ("day", "week", "month")
+
+        Returns:
+            dict sous-acquis → (nombre de résultats, somme des scores, nombre maîtrisés)
+        """
+        raise NotImplementedError
+
+    def iter_results(self, since=None):
+        """
+        Tous les résultats, dans l'ordre d'enregistrement
+
+        Args:
+            since: ne retourner que les résultats dont le timestamp est
+                   postérieur ou égal à celui-ci
+        """
+        raise NotImplementedError
+
+    def start(self):
+        """Démarre les tâches de fond éventuelles"""
+
+    def close(self):
+        """Termine les écritures en cours et libère les ressources"""
+
+    def metrics(self):
+        """Métriques de persistance"""
+        return {}
+
+
+class JsonLogStorage(QuizStorage):
+    """
+    Instantanés JSON + journal append-only
+
+    Chaque évaluation est ajoutée en une ligne au journal quiz_events.jsonl
+    (écriture O(1)). Le journal est périodiquement replié dans les
+    instantanés students_profiles.json / quiz_results.json ; au démarrage,
+    l'état est reconstruit à partir des instantanés puis du journal.
+
+    Écriture différée (write-behind) : une fois start() appelé, les lignes
+    du journal sont mises en file et écrites par un thread qui regroupe les
+    écritures (toutes les flush_interval secondes ou dès flush_threshold
+    lignes). Avec durability="durable", l'appel n'est acquitté qu'après
+    l'écriture et le fsync de ses lignes ; avec "buffered", il l'est dès
+    la mise à jour en mémoire.
+
+    La mise à jour en mémoire n'est jamais annulée : si l'écriture échoue ou
+    si l'acquittement durable n'arrive pas dans DURABLE_TIMEOUT secondes,
+    record_results retourne PENDING. Les lignes restent en file jusqu'à la
+    prochaine écriture réussie, ou jusqu'à la compaction qui les replie dans
+    les instantanés.
+    """
+
+    # Compaction du journal : dès compact_threshold lignes, ou toutes les
+    # compact_interval secondes si le journal n'est pas vide
+    COMPACT_THRESHOLD = 1000
+    COMPACT_INTERVAL = 60
+
+    # Écriture différée du journal
+    DURABILITY_MODES = ("buffered", "durable")
+    FLUSH_INTERVAL = 0.2
+    FLUSH_THRESHOLD = 500
+    # Attente maximale d'un acquittement durable
+    DURABLE_TIMEOUT = 10
+
+    def __init__(self, data_dir="./", compact_interval=None, compact_threshold=None,
+                 durability="buffered", flush_interval=None, flush_threshold=None):
+        self.data_dir = data_dir
+        self.students_file = os.path.join(data_dir, "students_profiles.json")
+        self.results_file = os.path.join(data_dir, "quiz_results.json")
+        self.log_file = os.path.join(data_dir, "quiz_events.jsonl")
+        # Journal en cours de compaction (présent seulement si elle a été interrompue)
+        self.compacting_file = self.log_file + ".compacting"
+
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._log = None
+        self._log_records = 0
+        self._compactor = None
+        self._compact_wakeup = threading.Event()
+        self._compact_stop = threading.Event()
+        self.compact_interval = compact_interval or self.COMPACT_INTERVAL
+        self.compact_threshold = compact_threshold or self.COMPACT_THRESHOLD
+
+        if durability not in self.DURABILITY_MODES:
+            raise ValueError(f"Mode de durabilité inconnu: {durability} ({' ou '.join(self.DURABILITY_MODES)})")
+        self.durability = durability
+        self.flush_interval = flush_interval or self.FLUSH_INTERVAL
+        self.flush_threshold = flush_threshold or self.FLUSH_THRESHOLD
+        # Verrou des écritures dans le fichier journal (pris avant self._lock)
+        self._io_lock = threading.RLock()
+        self._flush_cond = threading.Condition(self._lock)
+        self._pending = []          # blocs de lignes en attente d'écriture
+        self._pending_records = 0
+        self._pending_since = None  # instant de mise en file du plus ancien bloc
+        self._enqueued = 0          # numéro du dernier enregistrement mis en file
+        self._flushed = 0           # numéro du dernier enregistrement écrit
+        self._flusher = None
+        self._flush_stop = False
+        self.flush_stats = {
+            'flushes': 0,
+            'records_flushed': 0,
+            'flush_errors': 0,
+            'last_flush_lag_ms': 0.0,
+            'max_flush_lag_ms': 0.0,
+            'last_flush_duration_ms': 0.0
+        }
+
+        # Charger ou créer les fichiers de données, puis rejouer le journal
+        # Profils indexés par student_id (l'ordre d'insertion est celui du fichier)
+        self.profiles = {}
+        for student in self._load_students():
+            self.profiles[student["student_id"]] = StudentProfile.from_dict(student)
+        self.results_data = self._load_results()
+        self._replay_log()
+        self._build_indexes()
+
+    def get_profile(self, student_id):
+        profile = self.profiles.get(student_id)
+        return None if profile is None else profile.to_profile()
+
+    def list_student_ids(self):
+        return list(self.profiles)
+
+    def count_students(self):
+        return len(self.profiles)
+
+    def subskill_counts(self):
+        with self._lock:
+            return self.struggling.as_dict()
+
+    def most_struggling(self, n=10):
+        with self._lock:
+            return self.struggling.most_common(n)
+
+    def export_profiles(self):
+        """Profils au format de students_profiles.json"""
+        with self._lock:
+            return [profile.to_dict() for profile in self.profiles.values()]
+
+    def record_results(self, result_entries):
+        # Une ligne de journal par résultat (avec le profil mis à jour), un seul write
+        students, records = [], []
+        with self._lock:
+            for result_entry in result_entries:
+                position = len(self.results_data)
+                self.results_data.append(result_entry)
+                self._index_result(result_entry, position)
+                student_id = result_entry["student_id"]
+                profile = self.profiles.get(student_id)
+                if profile is None:
+                    profile = self.profiles[student_id] = StudentProfile(student_id)
+                delta = profile.apply_result(result_entry["subskill_id"], result_entry["is_mastered"])
+                if delta:
+                    self.struggling.add(result_entry["subskill_id"], delta)
+                students.append(profile.to_profile())
+                records.append({
+                    "n": position,
+                    "result": result_entry,
+                    "profile": profile.to_dict()
+                })
+            # Comme les autres index : le résultat est dans results_data
+            self.windows.add_many(result_entries)
+            written, ticket = self._append_log(records)
+        # Hors verrou : le thread d'écriture doit pouvoir vider la file
+        if ticket is not None and self.durability == "durable":
+            written = self._wait_flushed(ticket)
+        return students, PERSISTED if written else PENDING
+
+    def _build_indexes(self):
+        """
+        Index construits une fois au chargement puis tenus à jour à chaque résultat
+
+        - historique de chaque étudiant trié par (timestamp, position) croissant
+        - agrégats cumulés globaux, par étudiant et par sous-acquis
+        - agrégats horaires des fenêtres glissantes (résultats récents)
+        - nombre d'étudiants en difficulté par sous-acquis
+        """
+        self.struggling = SubskillCounter()
+        for profile in self.profiles.values():
+            for subskill in profile.sous_acquis:
+                self.struggling.add(subskill)
+
+        self.history = {}
+        self._history_keys = {}
+        self.global_stats = RunningStats()
+        self.student_stats = {}
+        self.subskill_stats = {}
+        for position, result in enumerate(self.results_data):
+            self._index_result(result, position)
+
+        self.windows = WindowedStats()
+        oldest = cutoff()
+        self.windows.add_many(result for result in self.results_data if result.get("timestamp", "") >= oldest)
+
+    def _index_result(self, result, position):
+        """
+        Indexe un nouveau résultat (en fin d'historique dans le cas normal)
+
+        position est l'indice du résultat dans results_data : il départage
+        les résultats de même timestamp et sert de curseur de pagination.
+        """
+        self.global_stats.add(result)
+        self.student_stats.setdefault(result["student_id"], RunningStats()).add(result)
+        self.subskill_stats.setdefault(result["subskill_id"], RunningStats()).add(result)
+
+        keys = self._history_keys.setdefault(result["student_id"], [])
+        results = self.history.setdefault(result["student_id"], [])
+        key = (result.get("timestamp", ""), position)
+        index = len(keys) if not keys or key > keys[-1] else bisect.bisect(keys, key)
+        keys.insert(index, key)
+        results.insert(index, result)
+
+    def get_history(self, student_id, limit=None, before=None):
+        with self._lock:
+            keys = self._history_keys.get(student_id, [])
+            results = self.history.get(student_id, [])
+            end = bisect.bisect_left(keys, tuple(before)) if before is not None else len(results)
+            start = max(0, end - limit) if limit is not None else 0
+            # Plus récent en premier
+            return [(keys[i][1], results[i]) for i in range(end - 1, start - 1, -1)]
+
+    def get_totals(self, student_id=None):
+        with self._lock:
+            if student_id:
+                stats = self.student_stats.get(student_id)
+                return stats.totals() if stats else (0, 0.0, 0)
+            return self.global_stats.totals()
+
+    def get_subskill_totals(self):
+        with self._lock:
+            return {subskill: stats.totals() for subskill, stats in self.subskill_stats.items()}
+
+    def get_window_totals(self, window):
+        return self.windows.window_totals(window)
+
+    def iter_results(self, since=None):
+        # Les résultats ne sont jamais modifiés : copier la liste suffit
+        with self._lock:
+            if since is None:
+                results = list(self.results_data)
+            else:
+                results = [result for result in self.results_data if result["timestamp"] >= since]
+        return iter(results)
+
+    def start(self):
+        self.start_flusher()
+        self.start_background_compaction()
+
+    def close(self):
+        self.stop_flusher()
+        self.stop_background_compaction()
+
+    def metrics(self):
+        with self._lock:
+            pending_age = (time.monotonic() - self._pending_since) * 1000 if self._pending_since else 0.0
+            return {
+                'backend': 'json',
+                'durability': self.durability,
+                'write_behind': self._flusher is not None,
+                'flush_interval': self.flush_interval,
+                'flush_threshold': self.flush_threshold,
+                'pending_records': self._pending_records,
+                'pending_age_ms': pending_age,
+                'log_records': self._log_records,
+                **self.flush_stats
+            }
+
+    def _load_students(self):
+        """Charge le fichier students_profiles.json"""
+        if os.path.exists(self.students_file):
+            try:
+                with open(self.students_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"⚠️ Erreur lors du chargement de {self.students_file}: {e}")
+                return []
+        return []
+
+    def _load_results(self):
+        """Charge l'historique des résultats de quiz"""
+        if os.path.exists(self.results_file):
+            try:
+                with open(self.results_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"⚠️ Erreur lors du chargement de {self.results_file}: {e}")
+                return []
+        return []
+
+    def _save_students(self, students_data=None):
+        """Sauvegarde students_profiles.json (remplacement atomique)"""
+        return self._write_snapshot(self.students_file,
+                                    self.export_profiles() if students_data is None else students_data)
+
+    def _save_results(self, results_data=None):
+        """Sauvegarde quiz_results.json (remplacement atomique)"""
+        return self._write_snapshot(self.results_file,
+                                    self.results_data if results_data is None else results_data)
+
+    def _write_snapshot(self, path, data):
+        try:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            print(f"❌ Erreur lors de la sauvegarde de {path}: {e}")
+            return False
+
+    # ------------------------------------------------------------------
+    # Journal des évènements (append-only)
+    # ------------------------------------------------------------------
+
+    def _replay_log(self):
+        """
+        Rejoue le journal par-dessus les instantanés chargés
+
+        Chaque ligne porte la position "n" de son résultat dans results_data :
+        un résultat déjà présent dans l'instantané (compaction interrompue
+        après l'écriture de quiz_results.json) n'est pas ajouté deux fois.
+        Les profils sont des remplacements complets : les rejouer est idempotent.
+        """
+        replayed = 0
+        for path in (self.compacting_file, self.log_file):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Dernière ligne tronquée par un arrêt brutal
+                        print(f"⚠️ Ligne {line_number} illisible ignorée dans {path}")
+                        continue
+                    replayed += 1
+                    result = record.get("result")
+                    if result is not None and record.get("n", len(self.results_data)) >= len(self.results_data):
+                        self.results_data.append(result)
+                    profile = record.get("profile")
+                    if profile is not None:
+                        self.profiles[profile["student_id"]] = StudentProfile.from_dict(profile)
+
+        if replayed:
+            print(f"✅ {replayed} évènements rejoués depuis le journal")
+        if os.path.exists(self.compacting_file):
+            # Compaction interrompue : replier tout de suite les deux journaux
+            self._fold_log(rotate=False)
+        else:
+            self._log_records = replayed
+
+    def _append_log(self, records):
+        """
+        Ajoute des lignes au journal (sans réécrire l'historique)
+
+        Sans thread d'écriture, les lignes sont écrites immédiatement en un
+        seul write ; sinon elles sont mises en file.
+
+        Returns:
+            (succès, numéro à attendre pour un acquittement durable ou None)
+        """
+        if not records:
+            return True, None
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with self._lock:
+            if self._flusher is None:
+                return self._write_log(lines, len(records)), None
+
+            if not self._pending:
+                self._pending_since = time.monotonic()
+                self._flush_cond.notify_all()
+            self._pending.append(lines)
+            self._pending_records += len(records)
+            self._enqueued += len(records)
+            if self._pending_records >= self.flush_threshold or self.durability == "durable":
+                self._flush_cond.notify_all()
+            return True, self._enqueued
+
+    def _write_log(self, lines, count):
+        """
+        Écrit des lignes dans le journal (sans thread d'écriture, sous self._lock)
+
+        En cas d'échec, les lignes restent en file : elles sont écrites avant
+        celles de l'appel suivant, ou repliées par la compaction.
+        """
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        self._pending.append(lines)
+        self._pending_records += count
+        return self._write_pending()
+
+    def _write_pending(self):
+        """Écrit toutes les lignes en file sans relâcher self._lock (l'ordre est conservé)"""
+        try:
+            if self._log is None:
+                self._log = open(self.log_file, 'a', encoding='utf-8')
+            self._log.write("".join(self._pending))
+            self._log.flush()
+            if self.durability == "durable":
+                os.fsync(self._log.fileno())
+        except Exception as e:
+            print(f"❌ Erreur lors de l'écriture dans {self.log_file}: {e}")
+            self.flush_stats['flush_errors'] += 1
+            return False
+        self._log_records += self._pending_records
+        self._pending, self._pending_records, self._pending_since = [], 0, None
+        self._flushed = self._enqueued
+        self._flush_cond.notify_all()
+        if self._log_records >= self.compact_threshold:
+            self._compact_wakeup.set()
+        return True
+
+    def flush(self):
+        """
+        Écrit les lignes en attente en un seul write (et fsync en mode durable)
+
+        Returns:
+            False si l'écriture a échoué (les lignes restent en file)
+        """
+        with self._io_lock:
+            with self._lock:
+                if not self._pending:
+                    return True
+                if self._flusher is None:
+                    # Sans thread d'écriture, _append_log écrit aussi : rester sous verrou
+                    return self._write_pending()
+                lines = "".join(self._pending)
+                count, since, ticket = self._pending_records, self._pending_since, self._enqueued
+                self._pending, self._pending_records, self._pending_since = [], 0, None
+                log = self._log
+
+            # Écriture hors de self._lock : les évaluations continuent pendant l'I/O
+            started = time.monotonic()
+            try:
+                if log is None:
+                    log = self._log = open(self.log_file, 'a', encoding='utf-8')
+                log.write(lines)
+                log.flush()
+                if self.durability == "durable":
+                    os.fsync(log.fileno())
+            except Exception as e:
+                print(f"❌ Erreur lors de l'écriture dans {self.log_file}: {e}")
+                with self._lock:
+                    self._pending.insert(0, lines)
+                    self._pending_records += count
+                    self._pending_since = since
+                    self.flush_stats['flush_errors'] += 1
+                return False
+
+            finished = time.monotonic()
+            with self._flush_cond:
+                self._flushed = ticket
+                self._log_records += count
+                if self._log_records >= self.compact_threshold:
+                    self._compact_wakeup.set()
+                lag = (finished - since) * 1000
+                self.flush_stats['flushes'] += 1
+                self.flush_stats['records_flushed'] += count
+                self.flush_stats['last_flush_lag_ms'] = lag
+                self.flush_stats['max_flush_lag_ms'] = max(self.flush_stats['max_flush_lag_ms'], lag)
+                self.flush_stats['last_flush_duration_ms'] = (finished - started) * 1000
+                self._flush_cond.notify_all()
+        return True
+
+    def _wait_flushed(self, ticket):
+        """Attend que l'enregistrement numéro ticket soit écrit (mode durable)"""
+        with self._flush_cond:
+            return self._flush_cond.wait_for(lambda: self._flushed >= ticket, timeout=self.DURABLE_TIMEOUT)
+
+    def _flush_loop(self):
+        while True:
+            with self._flush_cond:
+                if not self._pending and not self._flush_stop:
+                    self._flush_cond.wait()
+                if self._flush_stop and not self._pending:
+                    return
+                if (self._pending and not self._flush_stop and self.durability != "durable"
+                        and self._pending_records < self.flush_threshold):
+                    # Regrouper les écritures arrivées pendant flush_interval
+                    remaining = self.flush_interval - (time.monotonic() - self._pending_since)
+                    if remaining > 0:
+                        self._flush_cond.wait(remaining)
+            if not self.flush():
+                if self._flush_stop:
+                    # Arrêt demandé : les lignes restent pour stop_flusher et la compaction
+                    return
+                # Échec d'écriture : réessayer après un intervalle
+                time.sleep(self.flush_interval)
+
+    def start_flusher(self):
+        """Démarre le thread d'écriture différée du journal"""
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flush_stop = False
+            self._flusher = threading.Thread(target=self._flush_loop, name="quiz-log-flusher", daemon=True)
+            self._flusher.start()
+
+    def stop_flusher(self):
+        """Arrête le thread d'écriture après avoir vidé la file"""
+        with self._flush_cond:
+            flusher = self._flusher
+            self._flush_stop = True
+            self._flush_cond.notify_all()
+        if flusher is not None:
+            flusher.join()
+        with self._lock:
+            self._flusher = None
+        self.flush()
+
+    def compact(self):
+        """
+        Replie le journal dans les instantanés JSON
+
+        Le journal courant est renommé (.compacting) et un nouveau journal est
+        ouvert sous verrou ; l'écriture des instantanés se fait ensuite hors
+        verrou, sans bloquer les évaluations.
+
+        Returns:
+            True si une compaction a eu lieu
+        """
+        with self._compact_lock:
+            with self._lock:
+                if (self._log_records == 0 and not self._pending
+                        and not os.path.exists(self.compacting_file)):
+                    return False
+            return self._fold_log(rotate=True)
+
+    def _fold_log(self, rotate):
+        # Vider la file d'écriture différée avant de changer de journal
+        with self._io_lock:
+            self.flush()
+            return self._fold_log_locked(rotate)
+
+    def _fold_log_locked(self, rotate):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            if rotate and os.path.exists(self.log_file):
+                if os.path.exists(self.compacting_file):
+                    # Compaction précédente en échec : ne pas écraser son journal
+                    with open(self.log_file, 'r', encoding='utf-8') as src, \
+                            open(self.compacting_file, 'a', encoding='utf-8') as dst:
+                        dst.write(src.read())
+                    os.remove(self.log_file)
+                else:
+                    os.replace(self.log_file, self.compacting_file)
+            # Les résultats ne sont jamais modifiés : copier la liste suffit ;
+            # les profils sont copiés car ils évoluent en place
+            results = list(self.results_data)
+            students = self.export_profiles()
+            self._log_records = 0
+            # Lignes encore en file (écriture en échec) : leur contenu est dans
+            # les instantanés, qui les rendent durables à leur place
+            dropped, dropped_ticket = self._pending_records, self._enqueued
+            self._pending, self._pending_records, self._pending_since = [], 0, None
+
+        # Résultats d'abord : au rejeu, "n" évite les doublons
+        if not (self._save_results(results) and self._save_students(students)):
+            if dropped:
+                with self._lock:
+                    # Ces résultats ne sont plus qu'en mémoire : refaire la compaction
+                    self._log_records += dropped
+            return False
+        if dropped:
+            with self._flush_cond:
+                self._flushed = max(self._flushed, dropped_ticket)
+                self._flush_cond.notify_all()
+        for path in (self.compacting_file,) if rotate else (self.compacting_file, self.log_file):
+            if os.path.exists(path):
+                os.remove(path)
+        print(f"✅ Journal compacté ({len(results)} résultats, {len(students)} profils)")
+        return True
+
+    def _compaction_loop(self, interval):
+        while not self._compact_stop.is_set():
+            self._compact_wakeup.wait(interval)
+            self._compact_wakeup.clear()
+            if self._compact_stop.is_set():
+                break
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"❌ Erreur lors de la compaction du journal: {e}")
+
+    def start_background_compaction(self):
+        """Démarre le thread de compaction périodique du journal"""
+        if self._compactor is not None:
+            return
+        self._compact_stop.clear()
+        self._compactor = threading.Thread(
+            target=self._compaction_loop,
+            args=(self.compact_interval,),
+            name="quiz-log-compaction",
+            daemon=True
+        )
+        self._compactor.start()
+
+    def stop_background_compaction(self):
+        """Arrête le thread de compaction et replie le journal une dernière fois"""
+        if self._compactor is not None:
+            self._compact_stop.set()
+            self._compact_wakeup.set()
+            self._compactor.join()
+            self._compactor = None
+        self.compact()
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+
+class SQLiteStorage(QuizStorage):
+    """
+    Stockage SQLite (mode WAL)
+
+    Les lectures ne bloquent pas les écritures, et plusieurs processus
+    peuvent partager la même base sur un même volume. Chaque thread utilise
+    sa propre connexion ; chaque évaluation est une transaction unique.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS students (
+            student_id TEXT PRIMARY KEY
+        );
+        CREATE TABLE IF NOT EXISTS student_subskills (
+            student_id TEXT NOT NULL,
+            subskill_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (student_id, subskill_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS quiz_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id TEXT NOT NULL,
+            course TEXT NOT NULL,
+            subskill_id TEXT NOT NULL,
+            total_questions INTEGER NOT NULL,
+            correct_answers INTEGER NOT NULL,
+            score REAL NOT NULL,
+            percentage REAL NOT NULL,
+            is_mastered INTEGER NOT NULL,
+            timestamp TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_results_student ON quiz_results (student_id);
+        CREATE INDEX IF NOT EXISTS idx_results_student_timestamp ON quiz_results (student_id, timestamp);
+        CREATE TABLE IF NOT EXISTS quiz_stats (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            score_sum REAL NOT NULL,
+            mastered INTEGER NOT NULL,
+            PRIMARY KEY (scope, key)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS subskill_struggling (
+            subskill_id TEXT PRIMARY KEY,
+            student_count INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS quiz_windows (
+            bucket INTEGER NOT NULL,
+            subskill_id TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            score_sum REAL NOT NULL,
+            mastered INTEGER NOT NULL,
+            PRIMARY KEY (bucket, subskill_id)
+        ) WITHOUT ROWID;
+    """
+
+    # Agrégats tenus à jour dans la même transaction que chaque résultat :
+    # portée "global" (clé vide), "student" (student_id) et "subskill" (subskill_id)
+    STATS_UPSERT = """
+        INSERT INTO quiz_stats (scope, key, count, score_sum, mastered) VALUES (?, ?, 1, ?, ?)
+        ON CONFLICT (scope, key) DO UPDATE SET
+            count = count + 1,
+            score_sum = score_sum + excluded.score_sum,
+            mastered = mastered + excluded.mastered
+    """
+
+    # Agrégats horaires des fenêtres glissantes (seaux de quiz_windows.py),
+    # mis à jour dans la même transaction ; les seaux expirés sont supprimés
+    WINDOW_UPSERT = """
+        INSERT INTO quiz_windows (bucket, subskill_id, count, score_sum, mastered) VALUES (?, ?, 1, ?, ?)
+        ON CONFLICT (bucket, subskill_id) DO UPDATE SET
+            count = count + 1,
+            score_sum = score_sum + excluded.score_sum,
+            mastered = mastered + excluded.mastered
+    """
+
+    RESULT_COLUMNS = ("student_id", "course", "subskill_id", "total_questions", "correct_answers",
+                      "score", "percentage", "is_mastered", "timestamp")
+
+    def __init__(self, db_path="quiz.db"):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._connection().executescript(self.SCHEMA)
+        self._rebuild_stats_if_missing()
+        self._rebuild_struggling_if_missing()
+        self._rebuild_windows_if_missing()
+
+    def _rebuild_stats_if_missing(self):
+        """Calcule les agrégats d'une base créée avant la table quiz_stats"""
+        connection = self._connection()
+        if connection.execute("SELECT 1 FROM quiz_stats LIMIT 1").fetchone() is not None:
+            return
+        if connection.execute("SELECT 1 FROM quiz_results LIMIT 1").fetchone() is None:
+            return
+
+        def work(connection):
+            connection.execute("DELETE FROM quiz_stats")
+            for scope, key in (("global", "''"), ("student", "student_id"), ("subskill", "subskill_id")):
+                connection.execute(
+                    f"INSERT INTO quiz_stats (scope, key, count, score_sum, mastered) "
+                    f"SELECT '{scope}', {key}, COUNT(*), SUM(score), SUM(is_mastered) "
+                    f"FROM quiz_results GROUP BY {key}"
+                )
+        self._transaction(work)
+        print(f"✅ Agrégats recalculés dans {self.db_path}")
+
+    def _rebuild_windows_if_missing(self):
+        """Calcule les seaux des fenêtres glissantes d'une base créée avant la table quiz_windows"""
+        connection = self._connection()
+        if connection.execute("SELECT 1 FROM quiz_windows LIMIT 1").fetchone() is not None:
+            return
+        since = cutoff()
+        if connection.execute("SELECT 1 FROM quiz_results WHERE timestamp >= ? LIMIT 1", (since,)).fetchone() is None:
+            return
+
+        def work(connection):
+            rows = connection.execute(
+                "SELECT subskill_id, score, is_mastered, timestamp FROM quiz_results WHERE timestamp >= ?",
+                (since,)
+            ).fetchall()
+            self._update_windows(connection, [
+                {"subskill_id": subskill_id, "score": score, "is_mastered": is_mastered, "timestamp": timestamp}
+                for subskill_id, score, is_mastered, timestamp in rows
+            ])
+        self._transaction(work)
+        print(f"✅ Agrégats des fenêtres glissantes recalculés dans {self.db_path}")
+
+    def _rebuild_struggling_if_missing(self):
+        connection = self._connection()
+        if connection.execute("SELECT 1 FROM subskill_struggling LIMIT 1").fetchone() is not None:
+            return
+        if connection.execute("SELECT 1 FROM student_subskills LIMIT 1").fetchone() is None:
+            return
+        self._transaction(self._rebuild_struggling)
+
+    def _rebuild_struggling(self, connection):
+        """Recompte les étudiants en difficulté par sous-acquis"""
+        connection.execute("DELETE FROM subskill_struggling")
+        connection.execute(
+            "INSERT INTO subskill_struggling (subskill_id, student_count) "
+            "SELECT subskill_id, COUNT(*) FROM student_subskills GROUP BY subskill_id"
+        )
+
+    def _connection(self):
+        """Connexion propre au thread courant"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # isolation_level=None : les transactions sont ouvertes explicitement
+            connection = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=5000")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _transaction(self, work):
+        """Exécute work(connection) dans une transaction d'écriture"""
+        connection = self._connection()
+        # IMMEDIATE : le verrou d'écriture est pris dès le début (pas d'échec de promotion)
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(connection)
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return result
+
+    def _row_to_result(self, row):
+        result = dict(zip(self.RESULT_COLUMNS, row))
+        result["is_mastered"] = bool(result["is_mastered"])
+        return result
+
+    def get_profile(self, student_id):
+        return self._read_profile(self._connection(), student_id)
+
+    def _read_profile(self, connection, student_id):
+        if connection.execute("SELECT 1 FROM students WHERE student_id = ?", (student_id,)).fetchone() is None:
+            return None
+        rows = connection.execute(
+            "SELECT subskill_id FROM student_subskills WHERE student_id = ? ORDER BY position",
+            (student_id,)
+        ).fetchall()
+        sous_acquis = [row[0] for row in rows]
+        return {"student_id": student_id, "sous_acquis": sous_acquis,
+                "sous_acquis_mask": SUBSKILL_INDEX.mask(sous_acquis)}
+
+    def list_student_ids(self):
+        rows = self._connection().execute("SELECT student_id FROM students ORDER BY rowid").fetchall()
+        return [row[0] for row in rows]
+
+    def count_students(self):
+        return self._connection().execute("SELECT COUNT(*) FROM students").fetchone()[0]
+
+    def subskill_counts(self):
+        rows = self._connection().execute(
+            "SELECT subskill_id, student_count FROM subskill_struggling WHERE student_count > 0"
+        ).fetchall()
+        return dict(rows)
+
+    def most_struggling(self, n=10):
+        rows = self._connection().execute(
+            "SELECT subskill_id, student_count FROM subskill_struggling WHERE student_count > 0 "
+            "ORDER BY student_count DESC LIMIT ?",
+            (n,)
+        ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def record_results(self, result_entries):
+        def work(connection):
+            self._insert_results(connection, result_entries)
+            profiles = []
+            for result_entry in result_entries:
+                self._apply_result(connection, result_entry)
+                profiles.append(self._read_profile(connection, result_entry["student_id"]))
+            return profiles
+
+        try:
+            return self._transaction(work), PERSISTED
+        except sqlite3.Error as e:
+            # Transaction annulée : profils inchangés
+            print(f"❌ Erreur lors de l'écriture dans {self.db_path}: {e}")
+            profiles = [self.get_profile(entry["student_id"]) or
+                        {"student_id": entry["student_id"], "sous_acquis": [], "sous_acquis_mask": 0}
+                        for entry in result_entries]
+            return profiles, FAILED
+
+    def _insert_results(self, connection, results):
+        connection.executemany(
+            f"INSERT INTO quiz_results ({', '.join(self.RESULT_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in self.RESULT_COLUMNS)})",
+            ([result[column] for column in self.RESULT_COLUMNS] for result in results)
+        )
+        for result in results:
+            score, mastered = result["score"], int(bool(result["is_mastered"]))
+            connection.execute(self.STATS_UPSERT, ("global", "", score, mastered))
+            connection.execute(self.STATS_UPSERT, ("student", result["student_id"], score, mastered))
+            connection.execute(self.STATS_UPSERT, ("subskill", result["subskill_id"], score, mastered))
+        self._update_windows(connection, results)
+
+    def _update_windows(self, connection, results):
+        oldest = oldest_bucket()
+        for result in results:
+            bucket = timestamp_bucket(result["timestamp"])
+            if bucket >= oldest:
+                connection.execute(self.WINDOW_UPSERT, (bucket, result["subskill_id"], result["score"],
+                                                        int(bool(result["is_mastered"]))))
+        connection.execute("DELETE FROM quiz_windows WHERE bucket < ?", (oldest,))
+
+    def _apply_result(self, connection, result_entry):
+        student_id, subskill_id = result_entry["student_id"], result_entry["subskill_id"]
+        connection.execute("INSERT OR IGNORE INTO students (student_id) VALUES (?)", (student_id,))
+        if not result_entry["is_mastered"]:
+            changed = connection.execute(
+                "INSERT OR IGNORE INTO student_subskills (student_id, subskill_id, position) "
+                "SELECT ?, ?, COALESCE(MAX(position) + 1, 0) FROM student_subskills WHERE student_id = ?",
+                (student_id, subskill_id, student_id)
+            ).rowcount
+            delta = 1
+        else:
+            changed = connection.execute(
+                "DELETE FROM student_subskills WHERE student_id = ? AND subskill_id = ?",
+                (student_id, subskill_id)
+            ).rowcount
+            delta = -1
+        if changed:
+            connection.execute(
+                "INSERT INTO subskill_struggling (subskill_id, student_count) VALUES (?, ?) "
+                "ON CONFLICT (subskill_id) DO UPDATE SET student_count = student_count + excluded.student_count",
+                (subskill_id, delta)
+            )
+
+    def get_history(self, student_id, limit=None, before=None):
+        # L'index (student_id, timestamp) contient aussi l'id (rowid) : le
+        # tri et le curseur (timestamp, id) restent des parcours d'index
+        query = f"SELECT id, {', '.join(self.RESULT_COLUMNS)} FROM quiz_results WHERE student_id = ?"
+        params = [student_id]
+        if before is not None:
+            query += " AND (timestamp, id) < (?, ?)"
+            params.extend(before)
+        query += " ORDER BY timestamp DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        rows = self._connection().execute(query, params).fetchall()
+        return [(row[0], self._row_to_result(row[1:])) for row in rows]
+
+    def get_totals(self, student_id=None):
+        scope, key = ("student", student_id) if student_id else ("global", "")
+        row = self._connection().execute(
+            "SELECT count, score_sum, mastered FROM quiz_stats WHERE scope = ? AND key = ?",
+            (scope, key)
+        ).fetchone()
+        return tuple(row) if row else (0, 0.0, 0)
+
+    def get_subskill_totals(self):
+        rows = self._connection().execute(
+            "SELECT key, count, score_sum, mastered FROM quiz_stats WHERE scope = 'subskill'"
+        ).fetchall()
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    def get_window_totals(self, window):
+        first, last = window_buckets(window)
+        rows = self._connection().execute(
+            "SELECT subskill_id, SUM(count), SUM(score_sum), SUM(mastered) FROM quiz_windows "
+            "WHERE bucket BETWEEN ? AND ? GROUP BY subskill_id",
+            (first, last)
+        ).fetchall()
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    def iter_results(self, since=None):
+        query = f"SELECT {', '.join(self.RESULT_COLUMNS)} FROM quiz_results"
+        params = []
+        if since is not None:
+            query += " WHERE timestamp >= ?"
+            params.append(since)
+        cursor = self._connection().execute(query + " ORDER BY id", params)
+        for row in cursor:
+            yield self._row_to_result(row)
+
+    # Tables vidées par import_data(replace=True)
+    DATA_TABLES = ("quiz_results", "quiz_stats", "quiz_windows", "subskill_struggling",
+                   "student_subskills", "students")
+
+    def import_data(self, students_data, results_data, replace=False):
+        """
+        Importe des profils et des résultats (une seule transaction)
+
+        Args:
+            replace: vider d'abord les tables de données (dans la même
+                     transaction) au lieu d'ajouter aux données existantes
+        """
+        def work(connection):
+            if replace:
+                for table in self.DATA_TABLES:
+                    connection.execute(f"DELETE FROM {table}")
+            self._insert_results(connection, results_data)
+            for student in students_data:
+                connection.execute("INSERT OR IGNORE INTO students (student_id) VALUES (?)",
+                                   (student["student_id"],))
+                connection.execute("DELETE FROM student_subskills WHERE student_id = ?",
+                                   (student["student_id"],))
+                connection.executemany(
+                    "INSERT OR IGNORE INTO student_subskills (student_id, subskill_id, position) VALUES (?, ?, ?)",
+                    ((student["student_id"], subskill, position)
+                     for position, subskill in enumerate(student.get("sous_acquis", [])))
+                )
+            self._rebuild_struggling(connection)
+        self._transaction(work)
+
+    def is_empty(self):
+        connection = self._connection()
+        return (connection.execute("SELECT 1 FROM students LIMIT 1").fetchone() is None and
+                connection.execute("SELECT 1 FROM quiz_results LIMIT 1").fetchone() is None)
+
+    def metrics(self):
+        # Chaque lot est validé par sa propre transaction (pas d'écriture différée)
+        return {'backend': 'sqlite', 'durability': 'durable', 'write_behind': False}
+
+    def close(self):
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def migrate_json_to_sqlite(data_dir=".", db_path="quiz.db", force=False):
+    """
+    Copie les fichiers JSON (instantanés + journal) dans une base SQLite
+
+    Refuse d'écrire dans une base non vide, sauf avec force=True : son
+    contenu est alors remplacé (pas de résultats ni d'agrégats en double).
+
+    Returns:
+        (nombre de profils, nombre de résultats) importés
+    """
+    source = JsonLogStorage(data_dir)
+    target = SQLiteStorage(db_path)
+    try:
+        if not force and not target.is_empty():
+            raise ValueError(f"{db_path} contient déjà des données (utiliser --force)")
+        students = source.export_profiles()
+        target.import_data(students, source.results_data, replace=force)
+        return len(students), len(source.results_data)
+    finally:
+        target.close()
+
+
+def create_storage(data_dir="./", backend=None):
+    """Crée le stockage configuré par QUIZ_STORAGE ("json" ou "sqlite")"""
+    backend = (backend or os.getenv("QUIZ_STORAGE", "json")).lower()
+    if backend == "sqlite":
+        db_path = os.getenv("QUIZ_DB_PATH", os.path.join(data_dir, "quiz.db"))
+        storage = SQLiteStorage(db_path)
+        if storage.is_empty() and os.path.exists(os.path.join(data_dir, "students_profiles.json")):
+            print(f"⚠️ Base {db_path} vide : importer les données JSON avec "
+                  f"'python quiz_storage.py migrate --data-dir {data_dir} --db {db_path}'")
+        print(f"✅ Stockage SQLite: {db_path}")
+        return storage
+    if backend == "json":
+        return JsonLogStorage(
+            data_dir,
+            compact_interval=float(os.getenv("QUIZ_LOG_COMPACT_INTERVAL", str(JsonLogStorage.COMPACT_INTERVAL))),
+            compact_threshold=int(os.getenv("QUIZ_LOG_COMPACT_THRESHOLD", str(JsonLogStorage.COMPACT_THRESHOLD))),
+            durability=os.getenv("QUIZ_DURABILITY", "buffered").lower(),
+            flush_interval=float(os.getenv("QUIZ_FLUSH_INTERVAL", str(JsonLogStorage.FLUSH_INTERVAL))),
+            flush_threshold=int(os.getenv("QUIZ_FLUSH_THRESHOLD", str(JsonLogStorage.FLUSH_THRESHOLD)))
+        )
+    raise ValueError(f"QUIZ_STORAGE inconnu: {backend} (json ou sqlite)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Outils de stockage des résultats de quiz")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate = subparsers.add_parser("migrate", help="Importe les fichiers JSON dans une base SQLite")
+    migrate.add_argument("--data-dir", default=".")
+    migrate.add_argument("--db", default="quiz.db")
+    migrate.add_argument("--force", action="store_true", help="Remplacer le contenu d'une base non vide")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        try:
+            profiles, results = migrate_json_to_sqlite(args.data_dir, args.db, force=args.force)
+        except ValueError as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+        print(f"✅ {profiles} profils et {results} résultats importés dans {args.db}")
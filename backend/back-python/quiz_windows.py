@@ -0,0 +1,121 @@
+"""
+Agrégats des résultats de quiz par fenêtre glissante (jour, semaine, mois)
+
+Les résultats sont cumulés dans des seaux horaires par sous-acquis
+(tentatives, somme des scores, cours maîtrisés). Une fenêtre est la somme
+des seaux qu'elle couvre : le coût d'une requête dépend du nombre de seaux
+(au plus 720 pour un mois), pas du nombre de résultats. Les seaux plus
+anciens que la plus longue fenêtre sont supprimés au fil de l'eau.
+
+Les seaux sont tenus par le stockage, avec les autres agrégats : en mémoire
+(WindowedStats) pour les fichiers JSON, dans la table quiz_windows pour
+SQLite (partagée par toutes les instances de l'API). Les fonctions du
+module donnent les numéros de seaux communs aux deux.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+# Taille d'un seau (secondes) : la fenêtre "day" couvre les 24 derniers seaux,
+# heure en cours comprise
+BUCKET_SECONDS = 3600
+
+WINDOWS = {
+    "day": 24 * 3600,
+    "week": 7 * 24 * 3600,
+    "month": 30 * 24 * 3600,
+}
+
+# Nombre de seaux conservés (la plus longue fenêtre)
+RETENTION = max(WINDOWS.values()) // BUCKET_SECONDS
+
+
+def bucket_of(seconds):
+    """Numéro du seau d'un instant (secondes depuis l'epoch)"""
+    return int(seconds // BUCKET_SECONDS)
+
+
+def timestamp_bucket(timestamp):
+    """Numéro du seau d'un timestamp ISO 8601 sans fuseau (heure locale)"""
+    return bucket_of(datetime.fromisoformat(timestamp).timestamp())
+
+
+def oldest_bucket(now=None):
+    """Plus ancien seau conservé"""
+    return bucket_of(time.time() if now is None else now) - RETENTION + 1
+
+
+def window_buckets(window, now=None):
+    """
+    (premier, dernier) seaux couverts par une fenêtre glissante
+
+    Args:
+        window: nom de la fenêtre ("day", "week", "month")
+    """
+    if window not in WINDOWS:
+        raise ValueError(f"Fenêtre inconnue: {window} ({', '.join(WINDOWS)})")
+    current = bucket_of(time.time() if now is None else now)
+    return current - WINDOWS[window] // BUCKET_SECONDS + 1, current
+
+
+def cutoff(now=None):
+    """Timestamp ISO 8601 du début du plus ancien seau conservé"""
+    return datetime.fromtimestamp(oldest_bucket(now) * BUCKET_SECONDS).isoformat()
+
+
+class WindowedStats:
+    """Agrégats par sous-acquis dans des seaux de BUCKET_SECONDS secondes (en mémoire)"""
+
+    def __init__(self):
+        self.buckets = {}  # numéro de seau → {sous-acquis: [tentatives, somme des scores, maîtrisés]}
+        self._lock = threading.Lock()
+
+    def add(self, result_entry, now=None):
+        """Cumule un résultat dans le seau de son timestamp"""
+        self.add_many([result_entry], now)
+
+    def add_many(self, result_entries, now=None):
+        oldest = oldest_bucket(now)
+        with self._lock:
+            for result_entry in result_entries:
+                bucket = timestamp_bucket(result_entry["timestamp"])
+                if bucket < oldest:
+                    continue
+                totals = self.buckets.setdefault(bucket, {}).get(result_entry["subskill_id"])
+                if totals is None:
+                    totals = self.buckets[bucket][result_entry["subskill_id"]] = [0, 0.0, 0]
+                totals[0] += 1
+                totals[1] += result_entry["score"]
+                if result_entry["is_mastered"]:
+                    totals[2] += 1
+            self._prune(oldest)
+
+    def _prune(self, oldest):
+        for bucket in [bucket for bucket in self.buckets if bucket < oldest]:
+            del self.buckets[bucket]
+
+    def window_totals(self, window, now=None):
+        """
+        Totaux d'une fenêtre glissante
+
+        Args:
+            window: nom de la fenêtre ("day", "week", "month")
+
+        Returns:
+            dict sous-acquis → (tentatives, somme des scores, maîtrisés)
+        """
+        first, current = window_buckets(window, now)
+        totals = {}
+        with self._lock:
+            self._prune(oldest_bucket(now))
+            for bucket in range(first, current + 1):
+                for subskill_id, (count, score_sum, mastered) in self.buckets.get(bucket, {}).items():
+                    subskill_totals = totals.get(subskill_id)
+                    if subskill_totals is None:
+                        totals[subskill_id] = [count, score_sum, mastered]
+                    else:
+                        subskill_totals[0] += count
+                        subskill_totals[1] += score_sum
+                        subskill_totals[2] += mastered
+        return {subskill_id: tuple(values) for subskill_id, values in totals.items()}
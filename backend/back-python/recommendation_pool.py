@@ -0,0 +1,151 @@
+"""
+Pool de processus dédié au calcul des recommandations GCN
+
+Le calcul (entraînement ou passe forward) est CPU-bound : il est exécuté dans
+des processus séparés pour ne jamais bloquer la boucle asyncio d'uvicorn.
+La file d'attente est bornée : au-delà de max_pending requêtes en cours,
+les nouvelles demandes sont refusées (PoolSaturatedError → 503 Retry-After).
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Recommender propre à chaque processus worker (créé par _init_worker)
+_worker_recommender = None
+
+
+def _init_worker(data_dir, cache_size):
+    """Initialise le recommender dans le processus worker"""
+    global _worker_recommender
+    from gcn_recommender import GCNRecommender
+    _worker_recommender = GCNRecommender(data_dir=data_dir, cache_size=cache_size)
+
+
+def _sync_struggling_counts(struggling_counts):
+    """Applique les compteurs en direct transmis avec la tâche"""
+    if struggling_counts is not None:
+        _worker_recommender.update_struggling_counts(struggling_counts)
+
+
+def _recommend(student_data, max_recommendations, fine_tune_epochs=0, time_budget_ms=None,
+               struggling_counts=None):
+    """Tâche exécutée dans le worker"""
+    _sync_struggling_counts(struggling_counts)
+    return _worker_recommender.get_recommendations(
+        student_data=student_data,
+        max_recommendations=max_recommendations,
+        fine_tune_epochs=fine_tune_epochs,
+        time_budget_ms=time_budget_ms
+    )
+
+
+def _recommend_batch(students_data, max_recommendations, struggling_counts=None):
+    """Tâche exécutée dans le worker pour un lot d'étudiants"""
+    _sync_struggling_counts(struggling_counts)
+    return _worker_recommender.get_recommendations_batch(
+        students_data=students_data,
+        max_recommendations=max_recommendations
+    )
+
+
+class PoolSaturatedError(Exception):
+    """Levée quand la file d'attente du pool est pleine"""
+
+    def __init__(self, retry_after):
+        super().__init__("Trop de calculs de recommandations en cours")
+        self.retry_after = retry_after
+
+
+class RecommendationPool:
+    """Exécute les recommandations dans un pool de processus à file bornée"""
+
+    def __init__(self, data_dir=".", workers=2, max_pending=32, cache_size=1024, retry_after=1):
+        self.data_dir = data_dir
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.cache_size = cache_size
+        self.retry_after = retry_after
+        self.pending = 0
+        self.rejected = 0
+        self._executor = None
+        self._semaphore = None
+
+    def _get_executor(self):
+        """Crée le pool à la première utilisation"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.data_dir, self.cache_size)
+            )
+        return self._executor
+
+    def _get_semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        return self._semaphore
+
+    async def recommend(self, student_data, max_recommendations=5, wait=False,
+                        fine_tune_epochs=0, time_budget_ms=None, struggling_counts=None):
+        """
+        Calcule les recommandations d'un étudiant dans un worker
+
+        Args:
+            fine_tune_epochs, time_budget_ms: personnalisation du modèle
+                  (voir GCNRecommender.get_recommendations)
+            struggling_counts: compteurs d'étudiants en difficulté à jour
+                  (voir GCNRecommender.update_struggling_counts)
+            wait: si False, lève PoolSaturatedError quand la file est pleine ;
+                  si True, attend qu'une place se libère
+        """
+        return await self._run(_recommend, student_data, max_recommendations,
+                               fine_tune_epochs, time_budget_ms, struggling_counts, wait=wait)
+
+    async def recommend_batch(self, students_data, max_recommendations=5, wait=False,
+                              struggling_counts=None):
+        """Calcule les recommandations d'un lot d'étudiants dans un worker"""
+        return await self._run(_recommend_batch, students_data, max_recommendations,
+                               struggling_counts, wait=wait)
+
+    async def _run(self, task, *args, wait=False):
+        semaphore = self._get_semaphore()
+        if not wait and semaphore.locked():
+            self.rejected += 1
+            raise PoolSaturatedError(self.retry_after)
+
+        async with semaphore:
+            self.pending += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._get_executor(), task, *args)
+            except BrokenProcessPool:
+                # Un worker est mort : le pool sera recréé à la prochaine requête
+                self._executor = None
+                raise
+            finally:
+                self.pending -= 1
+
+    def start(self):
+        """Démarre les workers (évite la latence de démarrage à la première requête)"""
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(int)
+
+    def shutdown(self):
+        """Arrête les workers"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        """État du pool"""
+        return {
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'pending': self.pending,
+            'rejected': self.rejected,
+            'started': self._executor is not None
+        }
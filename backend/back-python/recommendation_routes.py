@@ -2,12 +2,17 @@
 Routes API pour le système de recommandation intelligent
 """
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional
+import asyncio
+import json
 import logging
+import os
 
-from quiz_scorer import QuizScorer, evaluate_quiz_result
+from quiz_scorer import QuizScorer
+from recommendation_pool import RecommendationPool, PoolSaturatedError
 
 # Essayer d'importer le recommender, sinon créer un fallback
 try:
@@ -28,25 +33,91 @@ class QuizResult(BaseModel):
     total_questions: int
     correct_answers: int
 
+class TimedQuizResult(QuizResult):
+    timestamp: Optional[str] = None  # date de passage (ISO 8601), par défaut maintenant
+
+class BatchQuizResults(BaseModel):
+    results: List[TimedQuizResult]
+
 class RecommendationRequest(BaseModel):
     student_id: str
     max_recommendations: Optional[int] = 5
 
-# Instance globale du scorer
-scorer = QuizScorer(data_dir=".")
+class BulkRecommendationRequest(BaseModel):
+    student_ids: Optional[List[str]] = None
+    all_students: bool = False
+    max_recommendations: int = Field(5, ge=1)
 
-# Instance globale du recommender (si disponible)
+# Instances globales, créées au démarrage de l'application et non à l'import :
+# les workers du pool (spawn) réimportent le module principal, ils ne doivent
+# ni rejouer le journal des quiz ni charger un second recommender
+scorer = None
 recommender = None
-if GCN_AVAILABLE:
-    try:
-        recommender = GCNRecommender(data_dir=".")
-        logger.info("✅ GCN Recommender initialisé")
-    except Exception as e:
-        logger.warning(f"⚠️ Impossible d'initialiser le GCN Recommender: {e}")
+recommendation_pool = None
+
+
+def init_services():
+    """Crée le scorer, le recommender et le pool de processus (startup)"""
+    global scorer, recommender, recommendation_pool
+    if scorer is not None:
+        # Les handlers d'un routeur inclus peuvent être appelés deux fois
+        return
+    scorer = QuizScorer(data_dir=".")
+    # Tâches de fond du stockage (compaction du journal JSON)
+    scorer.start()
+
+    if GCN_AVAILABLE:
+        try:
+            recommender = GCNRecommender(
+                data_dir=".",
+                cache_size=int(os.getenv("RECOMMENDATION_CACHE_SIZE", "1024"))
+            )
+            logger.info("✅ GCN Recommender initialisé")
+        except Exception as e:
+            logger.warning(f"⚠️ Impossible d'initialiser le GCN Recommender: {e}")
+
+    # Pool de processus pour les calculs GCN (hors de la boucle asyncio)
+    if recommender:
+        recommendation_pool = RecommendationPool(
+            data_dir=".",
+            workers=int(os.getenv("RECOMMENDER_WORKERS", "2")),
+            max_pending=int(os.getenv("RECOMMENDER_MAX_PENDING", "32")),
+            cache_size=int(os.getenv("RECOMMENDATION_CACHE_SIZE", "1024")),
+            retry_after=int(os.getenv("RECOMMENDER_RETRY_AFTER", "1"))
+        )
+        recommendation_pool.start()
+
+
+def shutdown_services():
+    """Arrête les workers et termine les écritures en cours (shutdown)"""
+    if recommendation_pool:
+        recommendation_pool.shutdown()
+    if scorer:
+        scorer.close()
+
+
+router.add_event_handler("startup", init_services)
+router.add_event_handler("shutdown", shutdown_services)
+
+# Taille maximale d'un lot de résultats de quiz
+MAX_BATCH_EVALUATIONS = int(os.getenv("QUIZ_MAX_BATCH_EVALUATIONS", "1000"))
+
+# Nombre d'étudiants calculés ensemble par un worker pour les requêtes groupées
+BULK_CHUNK_SIZE = int(os.getenv("RECOMMENDER_BULK_CHUNK_SIZE", "16"))
+
+
+def _all_mastered_response(student_id):
+    """Réponse pour un étudiant qui n'a plus de sous-acquis"""
+    return {
+        "student_id": student_id,
+        "message": "🎉 Félicitations ! Vous avez maîtrisé tous les cours disponibles.",
+        "total_non_mastered": 0,
+        "recommendations": []
+    }
 
 
 @router.post("/evaluate-quiz")
-async def evaluate_quiz(result: QuizResult):
+def evaluate_quiz(result: QuizResult):
     """
     Évalue un quiz et met à jour le profil de l'étudiant
 
@@ -79,8 +150,43 @@ async def evaluate_quiz(result: QuizResult):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/evaluate-quiz/batch")
+def evaluate_quiz_batch(batch: BatchQuizResults):
+    """
+    Évalue un lot de quiz (import des résultats d'une session d'examen)
+
+    Les entrées valides sont appliquées dans l'ordre du lot et persistées
+    en une seule écriture ; les entrées invalides sont signalées sans
+    bloquer les autres.
+
+    Retourne:
+    - total, evaluated, failed
+    - persistence: "persisted", "pending" (appliqué, écriture réessayée : ne
+      pas renvoyer le lot) ou "failed" (rien n'a été enregistré)
+    - results: un résultat par entrée (avec son index), ou une erreur
+    """
+    if len(batch.results) > MAX_BATCH_EVALUATIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lot trop volumineux ({len(batch.results)} > {MAX_BATCH_EVALUATIONS})"
+        )
+
+    try:
+        logger.info(f"📝 Évaluation groupée de {len(batch.results)} quiz")
+
+        outcome = scorer.evaluate_many([result.model_dump() for result in batch.results])
+
+        logger.info(f"✅ {outcome['evaluated']} quiz évalués, {outcome['failed']} rejetés")
+
+        return outcome
+
+    except Exception as e:
+        logger.error(f"❌ Erreur lors de l'évaluation groupée: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/student/{student_id}/profile")
-async def get_student_profile(student_id: str):
+def get_student_profile(student_id: str):
     """
     Récupère le profil complet d'un étudiant
 
@@ -91,7 +197,7 @@ async def get_student_profile(student_id: str):
     """
     try:
         profile = scorer.get_student_profile(student_id)
-        history = scorer.get_student_history(student_id)
+        history = scorer.get_student_history(student_id, limit=10)
         stats = scorer.get_statistics(student_id)
 
         return {
@@ -99,7 +205,7 @@ async def get_student_profile(student_id: str):
             "sous_acquis": profile.get("sous_acquis", []),
             "total_non_mastered": len(profile.get("sous_acquis", [])),
             "statistics": stats,
-            "recent_quizzes": history[:10]  # 10 derniers quiz
+            "recent_quizzes": history  # 10 derniers quiz
         }
 
     except Exception as e:
@@ -107,11 +213,54 @@ async def get_student_profile(student_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/student/{student_id}/history")
+def get_student_history(
+    student_id: str,
+    limit: int = Query(20, ge=1, le=500),
+    before: Optional[str] = None
+):
+    """
+    Historique paginé des quiz d'un étudiant (plus récent en premier)
+
+    Paramètres:
+    - limit: nombre de résultats par page
+    - before: curseur opaque ; utiliser next_before de la page précédente
+
+    Retourne:
+    - results: résultats de la page
+    - next_before: curseur de la page suivante (None s'il n'y en a plus)
+    """
+    try:
+        results, next_before = scorer.get_history_page(student_id, limit, cursor=before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Erreur lors de la récupération de l'historique: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "student_id": student_id,
+        "results": results,
+        "next_before": next_before
+    }
+
+
 @router.post("/student/{student_id}/recommendations")
-async def get_recommendations(student_id: str, max_recommendations: int = 5):
+async def get_recommendations(
+    student_id: str,
+    max_recommendations: int = 5,
+    fine_tune_epochs: int = Query(0, ge=0, le=200),
+    max_latency_ms: Optional[float] = Query(None, gt=0)
+):
     """
     Génère des recommandations personnalisées pour un étudiant
 
+    Paramètres optionnels de personnalisation (warm-start depuis le modèle
+    de population, arrêt anticipé sur plateau de la loss) :
+    - fine_tune_epochs: nombre maximal d'époques d'ajustement
+    - max_latency_ms: budget de temps du calcul (ex. 20 pour « finir en 20 ms »)
+    Sans PyTorch sur le serveur, ces paramètres sont refusés (501).
+
     Utilise le GCN pour analyser:
     - Les sous-acquis non maîtrisés
     - Les dépendances entre cours
@@ -123,14 +272,21 @@ async def get_recommendations(student_id: str, max_recommendations: int = 5):
     - Score de priorité pour chaque cours
     - Prérequis et indicateurs de difficulté
     """
-    if not GCN_AVAILABLE or not recommender:
+    if not GCN_AVAILABLE or not recommender or not recommender.can_recommend():
         return {
             "error": "Système de recommandation non disponible",
-            "fallback": "Veuillez installer PyTorch et torch-geometric",
+            "fallback": "Veuillez installer PyTorch et torch-geometric ou exporter gcn_model.npz",
             "student_id": student_id,
             "recommendations": []
         }
 
+    if (fine_tune_epochs or max_latency_ms is not None) and not recommender.can_personalize():
+        raise HTTPException(
+            status_code=501,
+            detail="Personnalisation non disponible sur ce serveur (PyTorch non installé) : "
+                   "retirer fine_tune_epochs et max_latency_ms pour le modèle partagé"
+        )
+
     try:
         logger.info(f"🤖 Génération de recommandations pour {student_id}")
 
@@ -138,30 +294,120 @@ async def get_recommendations(student_id: str, max_recommendations: int = 5):
         profile = scorer.get_student_profile(student_id)
 
         if not profile.get("sous_acquis"):
-            return {
-                "student_id": student_id,
-                "message": "🎉 Félicitations ! Vous avez maîtrisé tous les cours disponibles.",
-                "total_non_mastered": 0,
-                "recommendations": []
-            }
-
-        # Générer les recommandations avec le GCN
-        recommendations = recommender.get_recommendations(
+            return _all_mastered_response(student_id)
+
+        # Générer les recommandations avec le GCN (dans le pool de processus)
+        recommendations = await recommendation_pool.recommend(
             student_data=profile,
-            max_recommendations=max_recommendations
+            max_recommendations=max_recommendations,
+            fine_tune_epochs=fine_tune_epochs,
+            time_budget_ms=max_latency_ms,
+            struggling_counts=scorer.get_subskill_counts()
         )
 
         logger.info(f"✅ {len(recommendations.get('recommendations', []))} recommandations générées")
 
         return recommendations
 
+    except PoolSaturatedError as e:
+        logger.warning(f"⚠️ Pool de recommandations saturé ({recommendation_pool.pending} en cours)")
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"❌ Erreur lors de la génération des recommandations: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/students/recommendations")
+async def get_bulk_recommendations(request: BulkRecommendationRequest):
+    """
+    Génère les recommandations de plusieurs étudiants (tableau de bord d'une classe)
+
+    Corps de la requête:
+    - student_ids: liste d'identifiants, ou
+    - all_students: true pour tous les étudiants connus du QuizScorer
+
+    Retourne un flux NDJSON : une ligne JSON par étudiant, envoyée dès que
+    son calcul est terminé (l'ordre n'est donc pas garanti). Un identifiant
+    inconnu du QuizScorer produit {"student_id": ..., "error": "unknown student"}.
+    """
+    if not GCN_AVAILABLE or not recommender or not recommender.can_recommend():
+        return {
+            "error": "Système de recommandation non disponible",
+            "fallback": "Veuillez installer PyTorch et torch-geometric ou exporter gcn_model.npz",
+            "recommendations": []
+        }
+
+    if request.all_students:
+        student_ids = scorer.list_student_ids()
+    else:
+        student_ids = list(dict.fromkeys(request.student_ids or []))
+
+    logger.info(f"🤖 Recommandations groupées pour {len(student_ids)} étudiants")
+
+    return StreamingResponse(
+        _stream_bulk_recommendations(student_ids, request.max_recommendations),
+        media_type="application/x-ndjson"
+    )
+
+
+async def _recommend_chunk(student_ids, max_recommendations):
+    """Calcule les lignes NDJSON d'un groupe d'étudiants"""
+    profiles = {student_id: scorer.find_student_profile(student_id) for student_id in student_ids}
+    results = [{"student_id": student_id, "error": "unknown student"}
+               for student_id, profile in profiles.items() if profile is None]
+    profiles = [profile for profile in profiles.values() if profile is not None]
+    results.extend(_all_mastered_response(p["student_id"]) for p in profiles if not p.get("sous_acquis"))
+    to_compute = [p for p in profiles if p.get("sous_acquis")]
+
+    if to_compute:
+        try:
+            results.extend(await recommendation_pool.recommend_batch(
+                to_compute, max_recommendations, wait=True,
+                struggling_counts=scorer.get_subskill_counts()
+            ))
+        except Exception as e:
+            logger.error(f"❌ Erreur lors des recommandations groupées: {str(e)}")
+            results.extend({"student_id": p["student_id"], "error": str(e)} for p in to_compute)
+
+    return [json.dumps(result, ensure_ascii=False) + "\n" for result in results]
+
+
+async def _stream_bulk_recommendations(student_ids, max_recommendations):
+    """
+    Produit les lignes NDJSON au fil de l'eau
+
+    Au plus un groupe par worker est en cours de calcul : la mémoire reste
+    constante quelle que soit la taille de la classe.
+    """
+    chunks = (student_ids[i:i + BULK_CHUNK_SIZE] for i in range(0, len(student_ids), BULK_CHUNK_SIZE))
+    in_flight = set()
+    try:
+        for chunk in chunks:
+            in_flight.add(asyncio.create_task(_recommend_chunk(chunk, max_recommendations)))
+            if len(in_flight) < recommendation_pool.workers:
+                continue
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                for line in task.result():
+                    yield line
+
+        while in_flight:
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                for line in task.result():
+                    yield line
+    finally:
+        # Client déconnecté : abandonner les calculs restants
+        for task in in_flight:
+            task.cancel()
+
+
 @router.get("/student/{student_id}/statistics")
-async def get_student_statistics(student_id: str):
+def get_student_statistics(student_id: str):
     """
     Retourne les statistiques détaillées d'un étudiant
     """
@@ -193,12 +439,14 @@ async def get_model_info():
         }
 
     try:
+        recommender.update_struggling_counts(scorer.get_subskill_counts())
         model_info = recommender.get_model_info()
         difficulty_analysis = recommender.get_lesson_difficulty_analysis()
 
         return {
             "gcn_available": True,
             "model_info": model_info,
+            "worker_pool": recommendation_pool.stats(),
             "difficulty_analysis": difficulty_analysis,
             "mastery_threshold": scorer.MASTERY_THRESHOLD * 100
         }
@@ -209,32 +457,62 @@ async def get_model_info():
 
 
 @router.get("/global-statistics")
-async def get_global_statistics():
+def get_global_statistics():
     """
     Statistiques globales de tous les étudiants
     """
     try:
         stats = scorer.get_statistics()
-        total_students = len(scorer.students_data)
+        total_students = scorer.count_students()
 
-        # Analyser les sous-acquis les plus problématiques
-        all_sous_acquis = []
-        for student in scorer.students_data:
-            all_sous_acquis.extend(student.get("sous_acquis", []))
-
-        from collections import Counter
-        sous_acquis_counts = Counter(all_sous_acquis)
+        # Sous-acquis les plus problématiques (compteurs tenus à jour par le QuizScorer)
         most_difficult = [
             {"subskill": sk, "student_count": count}
-            for sk, count in sous_acquis_counts.most_common(10)
+            for sk, count in scorer.get_most_difficult_subskills(10)
         ]
 
         return {
             "total_students": total_students,
             "quiz_statistics": stats,
+            "subskill_statistics": scorer.get_subskill_statistics(),
             "most_difficult_subskills": most_difficult
         }
 
     except Exception as e:
         logger.error(f"❌ Erreur: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/windowed-statistics")
+def get_windowed_statistics(window: Optional[str] = Query(None, pattern="^(day|week|month)$")):
+    """
+    Tentatives et taux de maîtrise par sous-acquis sur les dernières 24 h,
+    7 jours et 30 jours (agrégats horaires tenus à jour à chaque évaluation)
+
+    Paramètres:
+    - window: day, week ou month (toutes les fenêtres par défaut)
+    """
+    try:
+        return scorer.get_windowed_statistics([window] if window else None)
+
+    except Exception as e:
+        logger.error(f"❌ Erreur: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/storage-metrics")
+def get_storage_metrics():
+    """
+    État de la persistance des résultats de quiz
+
+    Retourne:
+    - backend et mode de durabilité
+    - file d'écriture différée (enregistrements en attente, ancienneté)
+    - nombre d'écritures et délai entre mise en file et écriture
+    """
+    try:
+        return scorer.get_storage_metrics()
+
+    except Exception as e:
+        logger.error(f"❌ Erreur: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,134 @@
+"""
+Représentation des ensembles de sous-acquis par masques de bits
+
+Chaque sous-acquis reçoit une position fixe : un ensemble de sous-acquis
+(profil d'un étudiant, prérequis d'un cours) devient un simple entier.
+Les 42 sous-acquis tiennent dans un mot machine, et les tests d'inclusion
+ou d'intersection se réduisent à quelques opérations bit à bit.
+"""
+
+
+def iter_bits(mask):
+    """Positions des bits à 1 de mask, par ordre croissant"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class SubskillIndex:
+    """Association sous-acquis ↔ position de bit"""
+
+    def __init__(self, subskills):
+        self.subskills = tuple(dict.fromkeys(subskills))
+        self.positions = {subskill: i for i, subskill in enumerate(self.subskills)}
+
+    def __len__(self):
+        return len(self.subskills)
+
+    def __contains__(self, subskill):
+        return subskill in self.positions
+
+    def bit(self, subskill):
+        """Masque d'un seul sous-acquis (0 s'il est inconnu)"""
+        position = self.positions.get(subskill)
+        return 0 if position is None else 1 << position
+
+    def mask(self, subskills):
+        """Masque d'un ensemble de sous-acquis (les inconnus sont ignorés)"""
+        mask = 0
+        positions = self.positions
+        for subskill in subskills:
+            position = positions.get(subskill)
+            if position is not None:
+                mask |= 1 << position
+        return mask
+
+    def extended(self, subskills):
+        """
+        Index complété par les sous-acquis absents
+
+        Les positions existantes sont conservées : un masque calculé avec
+        l'index d'origine reste valide dans l'index étendu.
+        """
+        missing = [s for s in dict.fromkeys(subskills) if s not in self.positions]
+        if not missing:
+            return self
+        return SubskillIndex(self.subskills + tuple(missing))
+
+    def compile_prerequisites(self, dependencies):
+        """
+        Compile un graphe de prérequis en masques
+
+        Args:
+            dependencies: dict sous-acquis → liste de ses prérequis
+
+        Returns:
+            dependents : dependents[i] est le masque des sous-acquis qui ont le
+            sous-acquis de position i parmi leurs prérequis
+        """
+        dependents = [0] * len(self.subskills)
+        for subskill, prereqs in dependencies.items():
+            subskill_bit = self.bit(subskill)
+            for position in iter_bits(self.mask(prereqs)):
+                dependents[position] |= subskill_bit
+        return dependents
+
+    def blocked(self, dependents, mask):
+        """Masque des sous-acquis dont au moins un prérequis est dans mask"""
+        blocked = 0
+        for position in iter_bits(mask):
+            blocked |= dependents[position]
+        return blocked
+
+
+# Mapping cours → sous-acquis de la plateforme (utilisé par QuizScorer)
+# Chaque cours correspond à un sous-acquis spécifique
+COURSE_TO_SUBSKILL = {
+    (1, 1): "1.1",  # Cours 1, Partie 1 → Sous-acquis 1.1
+    (1, 2): "1.2",
+    (1, 3): "1.3",
+    (1, 4): "1.4",
+    (1, 5): "1.5",
+    (1, 6): "1.6",
+    (1, 7): "1.7",
+    (2, 1): "2.1",
+    (2, 2): "2.2",
+    (2, 3): "2.3",
+    (3, 1): "3.1",
+    (3, 2): "3.2",
+    (3, 3): "3.3",
+    (3, 4): "3.4",
+    (4, 1): "4.1",
+    (4, 2): "4.2",
+    (4, 3): "4.3",
+    (4, 4): "4.4",
+    (4, 5): "4.5",
+    (4, 6): "4.6",
+    (4, 7): "4.7",
+    (4, 8): "4.8",
+    (4, 9): "4.9",
+    (5, 1): "5.1",
+    (5, 2): "5.2",
+    (5, 3): "5.3",
+    (5, 4): "5.4",
+    (5, 5): "5.5",
+    (5, 6): "5.6",
+    (5, 7): "5.7",
+    (6, 1): "6.1",
+    (6, 2): "6.2",
+    (6, 3): "6.3",
+    (7, 1): "7.1",
+    (7, 2): "7.2",
+    (7, 3): "7.3",
+    (8, 1): "8.1",
+    (8, 2): "8.2",
+    (8, 3): "8.3",
+    (8, 4): "8.4",
+    (8, 5): "8.5",
+    (8, 6): "8.6",
+}
+
+# Positions de bit dans l'ordre du mapping : partagées par le scorer (profils
+# étudiants) et le recommender (prérequis des cours)
+SUBSKILL_INDEX = SubskillIndex(COURSE_TO_SUBSKILL.values())
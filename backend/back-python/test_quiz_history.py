@@ -0,0 +1,65 @@
+"""
+Pagination de l'historique des quiz : résultats partageant un même timestamp
+
+Usage: python -m pytest test_quiz_history.py
+"""
+
+import pytest
+
+from quiz_scorer import QuizScorer
+from quiz_storage import JsonLogStorage, SQLiteStorage
+
+TIMESTAMP = "2025-03-10T09:00:00"
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def scorer(request, tmp_path):
+    if request.param == "json":
+        storage = JsonLogStorage(str(tmp_path))
+    else:
+        storage = SQLiteStorage(str(tmp_path / "quiz.db"))
+    scorer = QuizScorer(str(tmp_path), storage=storage)
+    yield scorer
+    scorer.close()
+
+
+def evaluation(course, part, correct, timestamp=TIMESTAMP):
+    return {"student_id": "S1", "course_number": course, "part_number": part,
+            "total_questions": 10, "correct_answers": correct, "timestamp": timestamp}
+
+
+def all_pages(scorer, limit):
+    pages, cursor = [], None
+    while True:
+        results, cursor = scorer.get_history_page("S1", limit, cursor=cursor)
+        pages.append(results)
+        if cursor is None:
+            return pages
+
+
+def test_same_timestamp_results_span_pages(scorer):
+    # Un lot de 5 résultats au même timestamp, entouré de deux autres
+    batch = [evaluation(1, part, part) for part in range(1, 6)]
+    scorer.evaluate_many([evaluation(8, 1, 9, "2025-03-10T08:00:00")] + batch +
+                         [evaluation(8, 2, 9, "2025-03-10T10:00:00")])
+
+    pages = all_pages(scorer, limit=2)
+    results = [result for page in pages for result in page]
+
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert len(results) == 7
+    # Plus récent en premier ; à timestamp égal, le dernier enregistré en premier
+    assert [result["course"] for result in results] == ["8.2", "1.5", "1.4", "1.3", "1.2", "1.1", "8.1"]
+
+
+def test_history_matches_pages(scorer):
+    scorer.evaluate_many([evaluation(2, 1, 5)] * 3 + [evaluation(2, 2, 9)] * 3)
+
+    pages = all_pages(scorer, limit=4)
+
+    assert [result for page in pages for result in page] == scorer.get_student_history("S1")
+
+
+def test_invalid_cursor_is_rejected(scorer):
+    with pytest.raises(ValueError):
+        scorer.get_history_page("S1", 2, cursor="pas-un-curseur")
@@ -0,0 +1,96 @@
+"""
+Statut de persistance des évaluations : "persisted", "pending" ou "failed"
+
+Usage: python -m pytest test_quiz_persistence.py
+"""
+
+import os
+
+from quiz_scorer import QuizScorer
+from quiz_storage import FAILED, PENDING, PERSISTED, JsonLogStorage, SQLiteStorage
+
+
+def evaluation(student, course, part, correct):
+    return {"student_id": student, "course_number": course, "part_number": part,
+            "total_questions": 10, "correct_answers": correct}
+
+
+def break_log(storage, tmp_path):
+    """Journal dans un dossier inexistant : les écritures suivantes échouent"""
+    storage.compact()
+    log_file = storage.log_file
+    storage.log_file = str(tmp_path / "absent" / "quiz_events.jsonl")
+    return log_file
+
+
+def test_failed_append_is_pending_and_retried(tmp_path):
+    scorer = QuizScorer(str(tmp_path), storage=JsonLogStorage(str(tmp_path)))
+    assert scorer.evaluate_many([evaluation("S1", 1, 1, 9)])["persistence"] == PERSISTED
+
+    log_file = break_log(scorer.storage, tmp_path)
+    outcome = scorer.evaluate_many([evaluation("S1", 1, 2, 3)])
+    assert outcome["persistence"] == PENDING
+    assert not outcome["persisted"]
+    # Appliqué en mémoire malgré l'échec
+    assert outcome["results"][0]["student_profile_updated"]
+    assert scorer.get_student_profile("S1")["sous_acquis"] == ["1.2"]
+
+    # L'écriture suivante réécrit d'abord les lignes en attente
+    scorer.storage.log_file = log_file
+    assert scorer.evaluate_quiz("S2", 2, 1, 10, 2)["persistence"] == PERSISTED
+    scorer.storage.stop_flusher()
+
+    reloaded = JsonLogStorage(str(tmp_path))
+    assert [result["course"] for _, result in reloaded.get_history("S1")] == ["1.2", "1.1"]
+    assert reloaded.get_profile("S2")["sous_acquis"] == ["2.1"]
+    scorer.close()
+
+
+def test_durable_timeout_is_pending(tmp_path):
+    storage = JsonLogStorage(str(tmp_path), durability="durable")
+    storage.DURABLE_TIMEOUT = 0.2
+    scorer = QuizScorer(str(tmp_path), storage=storage)
+    storage.start_flusher()
+
+    log_file = break_log(storage, tmp_path)
+    assert scorer.evaluate_quiz("S1", 3, 1, 10, 9)["persistence"] == PENDING
+
+    # Le thread d'écriture réessaie : la ligne est écrite une fois le journal réparé
+    storage.log_file = log_file
+    storage.stop_flusher()
+    assert storage.metrics()["pending_records"] == 0
+    with open(log_file, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
+    scorer.close()
+
+
+def test_compaction_folds_pending_lines(tmp_path):
+    scorer = QuizScorer(str(tmp_path), storage=JsonLogStorage(str(tmp_path)))
+    log_file = break_log(scorer.storage, tmp_path)
+    assert scorer.evaluate_quiz("S1", 4, 1, 10, 2)["persistence"] == PENDING
+
+    # Les instantanés contiennent le résultat : la ligne en file n'est plus écrite
+    assert scorer.storage.compact()
+    scorer.storage.log_file = log_file
+    scorer.close()
+
+    assert not os.path.exists(log_file)
+    reloaded = JsonLogStorage(str(tmp_path))
+    assert reloaded.get_profile("S1")["sous_acquis"] == ["4.1"]
+    assert len(reloaded.get_history("S1")) == 1
+
+
+def test_sqlite_error_is_failed(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "quiz.db"))
+    scorer = QuizScorer(str(tmp_path), storage=storage)
+    storage._connection().execute(
+        "CREATE TRIGGER reject BEFORE INSERT ON quiz_results BEGIN SELECT RAISE(ABORT, 'refus'); END"
+    )
+
+    response = scorer.evaluate_quiz("S1", 5, 1, 10, 2)
+
+    assert response["persistence"] == FAILED
+    assert not response["student_profile_updated"]
+    assert scorer.find_student_profile("S1") is None
+    assert scorer.get_student_history("S1") == []
+    scorer.close()
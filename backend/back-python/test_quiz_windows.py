@@ -0,0 +1,60 @@
+"""
+Fenêtres glissantes : cohérence avec l'historique quand l'écriture échoue
+
+Usage: python -m pytest test_quiz_windows.py
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from quiz_scorer import QuizScorer
+from quiz_storage import JsonLogStorage
+from quiz_windows import WINDOWS, timestamp_bucket, window_buckets
+
+
+@pytest.fixture
+def scorer(tmp_path):
+    scorer = QuizScorer(str(tmp_path), storage=JsonLogStorage(str(tmp_path)))
+    yield scorer
+    scorer.close()
+
+
+def evaluation(student, course, part, correct, hours_ago=0):
+    timestamp = (datetime.now() - timedelta(hours=hours_ago)).isoformat()
+    return {"student_id": student, "course_number": course, "part_number": part,
+            "total_questions": 10, "correct_answers": correct, "timestamp": timestamp}
+
+
+def history_counts(scorer, window):
+    """Nombre de résultats par sous-acquis dans la fenêtre, recompté depuis l'historique"""
+    first, last = window_buckets(window)
+    counts = Counter()
+    for student_id in scorer.list_student_ids():
+        for result in scorer.get_student_history(student_id):
+            if first <= timestamp_bucket(result["timestamp"]) <= last:
+                counts[result["subskill_id"]] += 1
+    return counts
+
+
+def window_counts(scorer, window):
+    return {subskill: stats["attempts"]
+            for subskill, stats in scorer.get_windowed_statistics([window])[window]["subskills"].items()}
+
+
+def test_windows_match_history_when_append_fails(scorer, tmp_path):
+    assert scorer.evaluate_many([evaluation("S1", 1, 1, 9), evaluation("S2", 2, 1, 4, hours_ago=30)])["persisted"]
+
+    # Compaction (ferme le journal) puis journal dans un dossier inexistant :
+    # l'ajout échoue, les résultats restent en mémoire
+    scorer.storage.compact()
+    scorer.storage.log_file = str(tmp_path / "absent" / "quiz_events.jsonl")
+    outcome = scorer.evaluate_many([evaluation("S1", 1, 1, 5), evaluation("S3", 4, 2, 8, hours_ago=100),
+                                    evaluation("S2", 2, 1, 10, hours_ago=2)])
+    assert not outcome["persisted"]
+    assert outcome["evaluated"] == 3
+
+    for window in WINDOWS:
+        assert window_counts(scorer, window) == history_counts(scorer, window)
+    assert window_counts(scorer, "day") == {"1.1": 2, "2.1": 1}
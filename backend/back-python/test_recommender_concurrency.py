@@ -0,0 +1,110 @@
+"""
+GCNRecommender sous charge : requêtes concurrentes vs exécution série
+
+Chaque cas lance des centaines d'appels concurrents (cache désactivé) et
+vérifie que chaque résultat est identique à celui de l'exécution série pour
+le même étudiant : modèle partagé, entraînement par étudiant
+(train_for_student) et personnalisation (fine_tune_epochs > 0), avec des
+graines fixées.
+
+Usage: python -m pytest test_recommender_concurrency.py
+"""
+
+import json
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("torch_geometric")
+
+import torch  # noqa: E402
+from torch_geometric.data import Data  # noqa: E402
+
+from gcn_recommender import GCNRecommender  # noqa: E402
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+REQUESTS = 300
+THREADS = 16
+
+
+@pytest.fixture(scope="module")
+def students():
+    with open(os.path.join(DATA_DIR, "students_profiles.json"), encoding="utf-8") as f:
+        return [student for student in json.load(f) if student.get("sous_acquis")]
+
+
+@pytest.fixture(scope="module")
+def cold_recommender(tmp_path_factory):
+    # Aucun modèle enregistré : la personnalisation part de poids aléatoires
+    model_path = str(tmp_path_factory.mktemp("model") / "absent.pt")
+    return GCNRecommender(data_dir=DATA_DIR, model_path=model_path, cache_size=0)
+
+
+@pytest.fixture(scope="module")
+def warm_recommender(tmp_path_factory):
+    model_path = str(tmp_path_factory.mktemp("model") / "gcn_model.pt")
+    recommender = GCNRecommender(data_dir=DATA_DIR, model_path=model_path, cache_size=0)
+    recommender.train_population_model(epochs=30)
+    return recommender
+
+
+def workload(students, seed=0):
+    rng = random.Random(seed)
+    return [rng.randrange(len(students)) for _ in range(REQUESTS)]
+
+
+def run_concurrently(task, items):
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        return list(executor.map(task, items))
+
+
+def without_timing(result):
+    personalization = {k: v for k, v in result["personalization"].items() if k != "elapsed_ms"}
+    return {**result, "personalization": personalization}
+
+
+def test_shared_model_matches_serial(warm_recommender, students):
+    expected = [warm_recommender.get_recommendations(student) for student in students]
+    indices = workload(students)
+
+    results = run_concurrently(lambda i: warm_recommender.get_recommendations(students[i]), indices)
+
+    assert results == [expected[i] for i in indices]
+
+
+@pytest.mark.parametrize("recommender_fixture", ["cold_recommender", "warm_recommender"])
+def test_fine_tuning_matches_serial(request, recommender_fixture, students):
+    recommender = request.getfixturevalue(recommender_fixture)
+
+    def recommend(i):
+        # Graine fixée par étudiant : même entrée, même résultat
+        result = recommender.get_recommendations(students[i], fine_tune_epochs=5, seed=i)
+        return without_timing(result)
+
+    expected = [recommend(i) for i in range(len(students))]
+    indices = workload(students, seed=1)
+
+    results = run_concurrently(recommend, indices)
+
+    assert all(result["personalization"]["epochs"] > 0 for result in results)
+    assert results == [expected[i] for i in indices]
+
+
+def test_train_for_student_matches_serial(cold_recommender, students):
+    def scores(i):
+        sous_acquis = set(students[i]["sous_acquis"])
+        model = cold_recommender.train_for_student(sous_acquis, epochs=10, seed=i)
+        x = cold_recommender._build_node_features(sous_acquis)
+        with torch.no_grad():
+            return model(Data(x=torch.from_numpy(x), edge_index=cold_recommender.edge_index)).numpy().copy()
+
+    expected = [scores(i) for i in range(len(students))]
+    indices = workload(students, seed=2)
+
+    results = run_concurrently(scores, indices)
+
+    assert all(np.array_equal(result, expected[i]) for result, i in zip(results, indices))
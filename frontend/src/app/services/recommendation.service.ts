@@ -14,6 +14,7 @@ export interface QuizEvaluation {
   is_mastered: boolean;
   threshold: number;
   student_profile_updated: boolean;
+  persistence: 'persisted' | 'pending' | 'failed';
   message: string;
 }
 